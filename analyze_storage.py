@@ -5,11 +5,46 @@ Analyzes the stored video data and provides statistics.
 """
 
 import os
-from collections import defaultdict
+import time
+import heapq
+import sqlite3
+import argparse
+from bisect import bisect_left, bisect_right
 
-def analyze_storage():
+# View ranges of the distribution: (min views, max views, label)
+VIEW_RANGES = [
+    (0, 100, "0-100 views"),
+    (101, 1000, "101-1K views"),
+    (1001, 10000, "1K-10K views"),
+    (10001, 100000, "10K-100K views"),
+    (100001, float('inf'), "100K+ views")
+]
+
+def iter_video_blocks(storage_file):
+    """
+    Yield the lines of each video block of the storage file, reading it line by line
+    """
+    lines = []
+    with open(storage_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                lines.append(line)
+            elif lines:
+                yield lines
+                lines = []
+    if lines:
+        yield lines
+
+def get_channel_id(lines):
+    """Channel ID of a video block, None for the blocks stored before the channel IDs were"""
+    if len(lines) >= 5 and lines[4].startswith('Channel ID: '):
+        return lines[4].replace('Channel ID: ', '')
+    return None
+
+def analyze_storage(columnar=False, rebuild_snapshot=False):
     """
-    Analyze the stored video data and calculate statistics
+    Analyze the stored video data and calculate statistics in a single pass over the file
     """
     storage_file = 'storage/links_info.txt'
     
@@ -18,41 +53,54 @@ def analyze_storage():
         print("Please run the TraceTracks script first to generate data.")
         return
     
+    if columnar:
+        try:
+            return analyze_columns(storage_file, rebuild_snapshot)
+        except ImportError:
+            print("Error: --columnar requires numpy (pip install numpy)")
+            return
+    
     total_views = 0
     total_videos = 0
-    channels = set()
+    total_blocks = 0
+    highest_views = 0
+    
+    # Statistics per channel: [videos, views], by channel ID (or by name for the videos stored without it)
+    channel_stats = {}
+    channel_names = {}
     
-    # Statistics per channel
-    channel_stats = defaultdict(lambda: {'videos': 0, 'views': 0})
+    # Number of videos per view range, found by bisecting the upper bounds of the ranges
+    range_bounds = [max_views for _, max_views, _ in VIEW_RANGES]
+    range_counts = [0] * len(VIEW_RANGES)
     
     try:
-        with open(storage_file, 'r', encoding='utf-8') as file:
-            content = file.read().strip()
-            
-            if not content:
-                print("Storage file is empty!")
-                return
-            
-            video_blocks = content.split('\n\n')            
-            for block in video_blocks:
-                if block.strip():
-                    lines = block.strip().split('\n')
+        for lines in iter_video_blocks(storage_file):
+            total_blocks += 1
+            if len(lines) >= 4:
+                try:
+                    views = int(lines[1].replace('Views: ', ''))
+                    author = lines[2].replace('Author: ', '')
+                    channel = get_channel_id(lines) or author
+                    channel_names[channel] = author
+                    
+                    total_views += views
+                    total_videos += 1
+                    highest_views = max(highest_views, views)
+                    
+                    stats = channel_stats.get(channel)
+                    if stats is None:
+                        channel_stats[channel] = [1, views]
+                    else:
+                        stats[0] += 1
+                        stats[1] += views
                     
-                    if len(lines) >= 4:
-                        try:
-                            views = int(lines[1].replace('Views: ', ''))
-                            author = lines[2].replace('Author: ', '')
-                            
-                            total_views += views
-                            total_videos += 1
-                            channels.add(author)
-                            
-                            channel_stats[author]['videos'] += 1
-                            channel_stats[author]['views'] += views
-                            
-                        except ValueError as e:
-                            print(f"Warning: Could not parse views for block: {block[:50]}...")
-                            continue
+                    if views >= 0:
+                        range_counts[bisect_left(range_bounds, views)] += 1
+                    
+                except ValueError as e:
+                    block = '\n'.join(lines)
+                    print(f"Warning: Could not parse views for block: {block[:50]}...")
+                    continue
     
     except FileNotFoundError:
         print("Error: storage/links_info.txt not found!")
@@ -61,37 +109,54 @@ def analyze_storage():
         print(f"Error reading storage file: {e}")
         return
     
+    if not total_blocks:
+        print("Storage file is empty!")
+        return
+    
+    top_by_videos = heapq.nlargest(10, channel_stats.items(), key=lambda x: x[1][0])
+    top_by_views = heapq.nlargest(10, channel_stats.items(), key=lambda x: x[1][1])
+    
+    print_report(
+        total_videos, total_views, len(channel_stats),
+        [(channel_names[channel], videos, views) for channel, (videos, views) in top_by_videos],
+        [(channel_names[channel], videos, views) for channel, (videos, views) in top_by_views],
+        highest_views, range_counts
+    )
+
+def print_report(total_videos, total_views, total_channels, top_by_videos, top_by_views,
+                 highest_views, range_counts, percentiles=None):
+    """
+    Display the statistics. The top channels are lists of (channel, videos, views)
+    """
     # Display overall statistics
     print("="*60)
     print("STORAGE ANALYTICS - OVERALL STATISTICS")
     print("="*60)
     print(f"Total Videos: {total_videos:,}")
     print(f"Total Views: {total_views:,}")
-    print(f"Total Different Channels: {len(channels)}")
+    print(f"Total Different Channels: {total_channels}")
     print()
     
     # Display top channels by video count
     print("="*60)
     print("TOP CHANNELS BY VIDEO COUNT")
     print("="*60)
-    sorted_by_videos = sorted(channel_stats.items(), key=lambda x: x[1]['videos'], reverse=True)
     
-    for i, (channel, stats) in enumerate(sorted_by_videos[:10], 1):
-        avg_views = stats['views'] / stats['videos'] if stats['videos'] > 0 else 0
+    for i, (channel, videos, views) in enumerate(top_by_videos, 1):
+        avg_views = views / videos if videos > 0 else 0
         print(f"{i:2}. {channel}")
-        print(f"    Videos: {stats['videos']:,} | Total Views: {stats['views']:,} | Avg Views: {avg_views:,.1f}")
+        print(f"    Videos: {videos:,} | Total Views: {views:,} | Avg Views: {avg_views:,.1f}")
         print()
     
     # Display top channels by total views
     print("="*60)
     print("TOP CHANNELS BY TOTAL VIEWS")
     print("="*60)
-    sorted_by_views = sorted(channel_stats.items(), key=lambda x: x[1]['views'], reverse=True)
     
-    for i, (channel, stats) in enumerate(sorted_by_views[:10], 1):
-        avg_views = stats['views'] / stats['videos'] if stats['videos'] > 0 else 0
+    for i, (channel, videos, views) in enumerate(top_by_views, 1):
+        avg_views = views / videos if videos > 0 else 0
         print(f"{i:2}. {channel}")
-        print(f"    Total Views: {stats['views']:,} | Videos: {stats['videos']:,} | Avg Views: {avg_views:,.1f}")
+        print(f"    Total Views: {views:,} | Videos: {videos:,} | Avg Views: {avg_views:,.1f}")
         print()
     
     # Display view distribution
@@ -99,45 +164,313 @@ def analyze_storage():
     print("VIEW DISTRIBUTION")
     print("="*60)
     
-    # Read all videos to analyze view distribution
-    all_views = []
-    with open(storage_file, 'r', encoding='utf-8') as file:
-        content = file.read().strip()
-        video_blocks = content.split('\n\n')
-        
-        for block in video_blocks:
-            if block.strip():
-                lines = block.strip().split('\n')
-                if len(lines) >= 4:
-                    try:
-                        views = int(lines[1].replace('Views: ', ''))
-                        all_views.append(views)
-                    except ValueError:
-                        continue
-    
-    if all_views:
-        all_views.sort()
-        print(f"Highest Views: {max(all_views):,}")
-        
-        # View ranges
-        ranges = [
-            (0, 100, "0-100 views"),
-            (101, 1000, "101-1K views"),
-            (1001, 10000, "1K-10K views"),
-            (10001, 100000, "10K-100K views"),
-            (100001, float('inf'), "100K+ views")
-        ]
+    if total_videos:
+        print(f"Highest Views: {highest_views:,}")
         
         print("\nView Ranges:")
-        for min_views, max_views, label in ranges:
-            count = sum(1 for v in all_views if min_views <= v <= max_views)
-            percentage = (count / len(all_views)) * 100 if all_views else 0
+        for (min_views, max_views, label), count in zip(VIEW_RANGES, range_counts):
+            percentage = (count / total_videos) * 100
             print(f"  {label}: {count:,} videos ({percentage:.1f}%)")
+        
+        if percentiles:
+            print("\nPercentiles:")
+            for percentile, views in percentiles:
+                print(f"  {percentile}th: {views:,.0f} views")
+
+# --- Columnar mode ---
+# Snapshot of the storage as columns, reused as long as links_info.txt doesn't change
+SNAPSHOT_FILE = 'storage/links_info.npz'
+
+def load_columns(storage_file, snapshot_file=SNAPSHOT_FILE, rebuild=False):
+    """
+    Load the storage as columns: views (int64), author codes (int32) and the author names indexed by code.
+    Returns None if the storage is empty.
+    """
+    import numpy as np
+    from tracetracks import Video, VideoColumns
+    
+    source_mtime = os.path.getmtime(storage_file)
+    source_size = os.path.getsize(storage_file)
+    
+    if not rebuild and os.path.exists(snapshot_file):
+        # Closed right away: an open snapshot can't be replaced on Windows. Each array read from it is a copy
+        with np.load(snapshot_file) as snapshot:
+            if snapshot['source_mtime'] == source_mtime and snapshot['source_size'] == source_size:
+                return snapshot['views'], snapshot['codes'], snapshot['authors']
+    
+    columns = VideoColumns()
+    total_blocks = 0
+    for lines in iter_video_blocks(storage_file):
+        total_blocks += 1
+        if len(lines) >= 4:
+            try:
+                video_views = int(lines[1].replace('Views: ', ''))
+            except ValueError:
+                block = '\n'.join(lines)
+                print(f"Warning: Could not parse views for block: {block[:50]}...")
+                continue
+            author = lines[2].replace('Author: ', '')
+            link = lines[3].replace('Link: ', '')
+            columns.append(Video.from_link(link, '', video_views, author, get_channel_id(lines)))
+    
+    if not total_blocks:
+        return None
+    
+    views = np.frombuffer(columns.views, dtype=np.int64) if columns else np.zeros(0, dtype=np.int64)
+    codes = (np.frombuffer(columns.author_codes, dtype=np.intc).astype(np.int32) if columns
+             else np.zeros(0, dtype=np.int32))
+    authors = np.array(columns.authors, dtype=str)
+    
+    np.savez(snapshot_file, views=views, codes=codes, authors=authors,
+             source_mtime=np.float64(source_mtime), source_size=np.int64(source_size))
+    return views, codes, authors
+
+def analyze_columns(storage_file, rebuild_snapshot=False):
+    """
+    Same statistics as analyze_storage(), computed with vectorized NumPy operations on the columns
+    """
+    import numpy as np
+    
+    columns = load_columns(storage_file, rebuild=rebuild_snapshot)
+    if columns is None:
+        print("Storage file is empty!")
+        return
+    views, codes, authors = columns
+    
+    # Per-channel aggregates, indexed by author code
+    channel_videos = np.bincount(codes, minlength=len(authors))
+    channel_views = np.bincount(codes, weights=views, minlength=len(authors)).astype(np.int64)
+    
+    # Stable sorts keep the channels in order of appearance on ties, like the streaming mode
+    top_by_videos = np.argsort(-channel_videos, kind='stable')[:10]
+    top_by_views = np.argsort(-channel_views, kind='stable')[:10]
+    
+    range_bounds = np.array([max_views for _, max_views, _ in VIEW_RANGES], dtype=np.float64)
+    valid_views = views[views >= 0]
+    range_counts = np.bincount(np.searchsorted(range_bounds, valid_views, side='left'), minlength=len(VIEW_RANGES))
+    
+    percentiles = None
+    if len(views):
+        levels = [50, 90, 99]
+        percentiles = list(zip(levels, np.percentile(views, levels).tolist()))
+    
+    print_report(
+        len(views), int(views.sum()), len(authors),
+        [(str(authors[i]), int(channel_videos[i]), int(channel_views[i])) for i in top_by_videos],
+        [(str(authors[i]), int(channel_videos[i]), int(channel_views[i])) for i in top_by_views],
+        int(views.max()) if len(views) else 0, [int(count) for count in range_counts], percentiles
+    )
+
+# --- Lookup ---
+def lookup_videos(queries):
+    """
+    Print the stored videos matching video IDs or links, reading only their blocks of links_info.txt
+    through the offset index of the text storage
+    """
+    from tracetracks import TextStore, Video
+    
+    if not os.path.exists('storage/links_info.txt'):
+        print("Error: storage/links_info.txt not found!")
+        return
+    
+    store = TextStore(read_only=True)
+    try:
+        for query in queries:
+            video = store.get(Video.id_from_link(query))
+            if video is None:
+                print(f"Not found: {query}\n")
+                continue
+            print(f"Title: {video.title}")
+            print(f"Views: {video.views:,}")
+            print(f"Author: {video.author}")
+            print(f"Link: {video.link}")
+            if video.channel_id:
+                print(f"Channel ID: {video.channel_id}")
+            print()
+    finally:
+        store.close()
+
+# SQLite storage of TraceTracks, with the channel index and the view history
+DATABASE_FILE = 'storage/tracetracks.db'
+
+# --- Reuploaders ---
+def analyze_reuploaders(limit=20):
+    """
+    Rank the channels reuploading the tracks of the most artists, across every artist processed with the sqlite storage,
+    with a single query on the channel index
+    """
+    from tracetracks import YOUTUBE_WATCH_URL
+    
+    if not os.path.exists(DATABASE_FILE):
+        print(f"Error: {DATABASE_FILE} not found!")
+        print("The channels are only indexed with the sqlite storage of TraceTracks.")
+        return
+    
+    conn = sqlite3.connect(DATABASE_FILE)
+    try:
+        rows = conn.execute(
+            'SELECT t.channel_id, COALESCE(c.title, '
+            "(SELECT author FROM videos v WHERE v.link = ? || t.video_id)), "
+            'COUNT(DISTINCT t.artist), COUNT(DISTINCT t.track_link), COUNT(DISTINCT t.video_id), '
+            'c.subscribers, c.video_count, '
+            "group_concat(DISTINCT a.name) "
+            'FROM channel_tracks t LEFT JOIN channels c ON c.channel_id = t.channel_id '
+            'JOIN artists a ON a.artist_id = t.artist '
+            'GROUP BY t.channel_id ORDER BY COUNT(DISTINCT t.artist) DESC, COUNT(DISTINCT t.track_link) DESC LIMIT ?',
+            (YOUTUBE_WATCH_URL, limit)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    
+    if not rows:
+        print("No reuploads indexed yet!")
+        return
+    
+    print("="*60)
+    print("TOP REUPLOADERS ACROSS ARTISTS")
+    print("="*60)
+    for i, (channel_id, title, artists, tracks, videos, subscribers, video_count, artist_names) in enumerate(rows, 1):
+        print(f"{i:2}. {title or channel_id} ({channel_id})")
+        print(f"    Artists: {artists:,} | Tracks: {tracks:,} | Videos: {videos:,}", end='')
+        if subscribers is not None:
+            print(f" | Subscribers: {subscribers:,} | Channel videos: {video_count:,}", end='')
+        print()
+        print(f"    {artist_names[:100]}")
+        print()
+
+# --- View history ---
+
+def analyze_history(days=30, periods=6):
+    """
+    Growth statistics from the view history of the sqlite storage: fastest-growing videos and channels over the
+    last `days` days, and the reach of each artist at the end of the last `periods` periods of `days` days.
+    The histories are streamed from the database and decoded one video at a time.
+    """
+    from tracetracks import decode_samples, YOUTUBE_WATCH_URL
+    
+    if not os.path.exists(DATABASE_FILE):
+        print(f"Error: {DATABASE_FILE} not found!")
+        print("The view history is only recorded with the sqlite storage of TraceTracks.")
+        return
+    
+    now = time.time()
+    since = now - days * 86400
+    period_ends = [now - k * days * 86400 for k in range(periods - 1, -1, -1)]
+    
+    fastest = []
+    # Growth per channel: [views gained, videos], by channel ID (or by name for the videos stored without it)
+    channel_growth = {}
+    channel_names = {}
+    # Reach per artist ID
+    artist_reach = {}
+    total_samples = 0
+    
+    conn = sqlite3.connect(DATABASE_FILE)
+    try:
+        artist_names = dict(conn.execute('SELECT artist_id, name FROM artists'))
+        rows = conn.execute(
+            'SELECT h.video_id, h.samples, v.title, v.author, v.channel_id, '
+            "(SELECT group_concat(artist, char(31)) FROM video_artists a WHERE a.video_id = h.video_id) "
+            'FROM view_history h LEFT JOIN videos v '
+            "ON v.link = CASE WHEN instr(h.video_id, '://') THEN h.video_id ELSE ? || h.video_id END",
+            (YOUTUBE_WATCH_URL,)
+        )
+        for video_id, blob, title, channel, channel_id, artists in rows:
+            samples = list(decode_samples(blob))
+            total_samples += len(samples)
+            timestamps = [timestamp for timestamp, _ in samples]
+            
+            # Growth since the last sample before the window (or the first sample)
+            base_at, base_views = samples[max(0, bisect_right(timestamps, since) - 1)]
+            last_at, last_views = samples[-1]
+            gained = last_views - base_views
+            if last_at > base_at:
+                entry = (gained / (last_at - base_at) * 86400, video_id, title or video_id, channel or '?', last_views)
+                if len(fastest) < 10:
+                    heapq.heappush(fastest, entry)
+                else:
+                    heapq.heappushpop(fastest, entry)
+            if channel:
+                channel_names[channel_id or channel] = channel
+                stats = channel_growth.setdefault(channel_id or channel, [0, 0])
+                stats[0] += gained
+                stats[1] += 1
+            
+            # Views at the end of each period: the last sample before it
+            if artists:
+                reach = [0] * periods
+                for k, end in enumerate(period_ends):
+                    position = bisect_right(timestamps, end)
+                    if position:
+                        reach[k] = samples[position - 1][1]
+                for artist in artists.split('\x1f'):
+                    totals = artist_reach.setdefault(artist, [0] * periods)
+                    for k in range(periods):
+                        totals[k] += reach[k]
+    finally:
+        conn.close()
+    
+    if not total_samples:
+        print("The view history is empty!")
+        return
+    
+    print("="*60)
+    print(f"FASTEST-GROWING VIDEOS (LAST {days} DAYS)")
+    print("="*60)
+    for i, (rate, video_id, title, channel, views) in enumerate(sorted(fastest, reverse=True), 1):
+        print(f"{i:2}. {title}")
+        print(f"    Channel: {channel} | +{rate:,.1f} views/day | Views: {views:,}")
+        print()
+    
+    print("="*60)
+    print(f"TOP CHANNELS BY GROWTH (LAST {days} DAYS)")
+    print("="*60)
+    top_channels = heapq.nlargest(10, channel_growth.items(), key=lambda x: x[1][0])
+    for i, (channel, (gained, videos)) in enumerate(top_channels, 1):
+        print(f"{i:2}. {channel_names[channel]}")
+        print(f"    Views gained: {gained:,} | Videos: {videos:,}")
+        print()
+    
+    print("="*60)
+    print(f"ARTIST REACH OVER TIME (TOTAL VIEWS, EVERY {days} DAYS)")
+    print("="*60)
+    top_artists = heapq.nlargest(10, artist_reach.items(), key=lambda x: x[1][-1])
+    print(f"{'ARTIST':<24}" + ''.join(f"{time.strftime('%Y-%m-%d', time.localtime(end)):>14}" for end in period_ends))
+    for artist, totals in top_artists:
+        artist = artist_names[artist]
+        print(f"{artist[:23]:<24}" + ''.join(f"{views:>14,}" for views in totals))
+    print(f"\n{total_samples:,} samples")
 
 def main():
+    parser = argparse.ArgumentParser(description='TraceTracks - Storage Analytics')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Load the storage as NumPy columns and compute the statistics vectorized (requires numpy)')
+    parser.add_argument('--rebuild-snapshot', action='store_true',
+                        help='With --columnar, re-parse links_info.txt instead of reusing storage/links_info.npz')
+    parser.add_argument('--lookup', type=str, nargs='+', metavar='VIDEO',
+                        help='Show the stored videos with these IDs or links, without reading the whole storage')
+    parser.add_argument('--reuploaders', action='store_true',
+                        help='Rank the channels reuploading the tracks of the most artists (sqlite storage)')
+    parser.add_argument('--history', action='store_true',
+                        help='Growth statistics from the view history of storage/tracetracks.db')
+    parser.add_argument('--days', type=int, default=30,
+                        help='With --history, length of the growth window and of the reach periods (default: 30)')
+    args = parser.parse_args()
+    
     print("TraceTracks - Storage Analytics")
     print("Analyzing stored video data...\n")
-    analyze_storage()
+    if args.lookup:
+        lookup_videos(args.lookup)
+    elif args.reuploaders:
+        analyze_reuploaders()
+    elif args.history:
+        analyze_history(args.days)
+    elif args.columnar:
+        analyze_storage(columnar=True, rebuild_snapshot=args.rebuild_snapshot)
+    else:
+        analyze_storage()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark for TraceTracks
+Measures the latency, request counts and peak memory of the main stages without calling the real APIs:
+YouTube and SoundCloud are replaced by fake clients answering synthetic responses.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+from urllib.parse import urlparse, parse_qs
+
+# Statistics of the fake APIs: number of requests per endpoint
+request_counts = {}
+
+def count_request(endpoint, latency):
+    request_counts[endpoint] = request_counts.get(endpoint, 0) + 1
+    if latency:
+        time.sleep(latency)
+
+# --- Fake YouTube API ---
+class FakeYouTubeRequest:
+    def __init__(self, api, kind, params):
+        self.api = api
+        self.kind = kind
+        self.params = params
+
+    def execute(self, http=None):
+        count_request(f'youtube.{self.kind}', self.api.latency)
+        if self.kind == 'search':
+            return self.api.search_response(self.params['q'], self.params.get('maxResults', 50))
+        if self.kind == 'channels':
+            return self.api.channels_response(self.params['id'].split(','))
+        return self.api.videos_response(self.params['id'].split(','))
+
+class FakeYouTubeResource:
+    def __init__(self, api, kind):
+        self.api = api
+        self.kind = kind
+
+    def list(self, **params):
+        return FakeYouTubeRequest(self.api, self.kind, params)
+
+class FakeYouTube:
+    """
+    Stand-in for the googleapiclient YouTube service. Search results are derived from the query,
+    so the same query always finds the same videos, and the descriptions contain the query.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.queries = {}
+
+    def search(self):
+        return FakeYouTubeResource(self, 'search')
+
+    def videos(self):
+        return FakeYouTubeResource(self, 'videos')
+
+    def channels(self):
+        return FakeYouTubeResource(self, 'channels')
+
+    def search_response(self, query, max_results):
+        seed = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        items = []
+        for i in range(max_results):
+            video_id = f'{seed[:8]}{i:03}'
+            self.queries[video_id] = query
+            items.append({'id': {'kind': 'youtube#video', 'videoId': video_id}})
+        return {'items': items}
+
+    def videos_response(self, video_ids):
+        items = []
+        for video_id in video_ids:
+            number = int(hashlib.sha1(video_id.encode('utf-8')).hexdigest()[:8], 16)
+            items.append({
+                'id': video_id,
+                'snippet': {
+                    'title': f'Video {video_id}',
+                    'description': f'Reupload of {self.queries.get(video_id, "")}',
+                    'channelTitle': f'Channel {number % 500}',
+                    'channelId': f'UC{number % 500:022}',
+                },
+                'statistics': {'viewCount': str(number % 1000000)},
+            })
+        return {'items': items}
+
+    def channels_response(self, channel_ids):
+        items = []
+        for channel_id in channel_ids:
+            number = int(channel_id[2:])
+            items.append({
+                'id': channel_id,
+                'snippet': {'title': f'Channel {number}'},
+                'statistics': {'subscriberCount': str(number * 37), 'videoCount': str(number % 200)},
+            })
+        return {'items': items}
+
+# --- Fake SoundCloud API ---
+class FakeResponse:
+    def __init__(self, data=None, text='', status_code=200):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = text or json.dumps(data)
+        self._data = data
+
+    def json(self):
+        return self._data
+
+class FakeSoundCloudSession:
+    """Stand-in for the requests.Session used for SoundCloud: an artist with `num_tracks` tracks"""
+
+    def __init__(self, num_tracks=200, latency=0.0):
+        self.num_tracks = num_tracks
+        self.latency = latency
+
+    def get(self, url, params=None, **kwargs):
+        parsed = urlparse(url)
+        params = dict(params or {})
+        params.update({key: values[0] for key, values in parse_qs(parsed.query).items()})
+
+        if parsed.path == '/versions.json':
+            count_request('soundcloud.versions', self.latency)
+            return FakeResponse({'app': '1700000000'})
+        if parsed.path == '/search':
+            count_request('soundcloud.search', self.latency)
+            return FakeResponse({'collection': [{'id': 1234}]})
+        if parsed.path.endswith('/tracks'):
+            count_request('soundcloud.tracks', self.latency)
+            return FakeResponse(self.tracks_page(int(params.get('offset', 0)), int(params.get('limit', 100))))
+        count_request('soundcloud.profile', self.latency)
+        return FakeResponse(text='<html>soundcloud://users:1234</html>')
+
+    def tracks_page(self, offset, limit):
+        # Most recent first, like the real API
+        collection = []
+        for number in range(self.num_tracks - 1 - offset, max(-1, self.num_tracks - 1 - offset - limit), -1):
+            collection.append({
+                'title': f'Track {number} (Techno Remix)',
+                'user': {'username': 'Bench Artist'},
+                'permalink_url': f'https://soundcloud.com/bench-artist/track-{number}',
+                'playback_count': (number * 7919) % 100000,
+            })
+        next_offset = offset + limit
+        next_href = None
+        if next_offset < self.num_tracks:
+            next_href = f'https://api-v2.soundcloud.com/users/1234/tracks?offset={next_offset}&limit={limit}'
+        return {'collection': collection, 'next_href': next_href}
+
+    def close(self):
+        pass
+
+# --- Synthetic Storage ---
+DATABASE_FILES = ['storage/tracetracks.db', 'storage/tracetracks.db-wal', 'storage/tracetracks.db-shm']
+
+def generate_store(path, num_videos, num_channels=None):
+    """Write a synthetic links_info.txt with num_videos videos"""
+    num_channels = num_channels or max(1, num_videos // 20)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        for i in range(num_videos):
+            views = (i * 2654435761) % 2000000
+            file.write(f"Title: Synthetic video {i}\nViews: {views}\nAuthor: Channel {i % num_channels}\n"
+                       f"Link: https://www.youtube.com/watch?v=syn{i:08}\n\n")
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+# --- Measurements ---
+results = []
+
+def measure(stage, function, *args, setup=None, **kwargs):
+    """
+    Run a stage with its output silenced, and record its duration, requests and peak memory.
+    The stage runs twice: traced for the peak memory, then timed with tracemalloc stopped, as tracing slows down
+    the allocations. setup (if any) is called before each run, so both start from the same state.
+    Returns the value of the timed run.
+    """
+    with open(os.devnull, 'w') as devnull:
+        def run():
+            if setup:
+                setup()
+            with contextlib.redirect_stdout(devnull):
+                return function(*args, **kwargs)
+
+        tracemalloc.start()
+        value = run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if hasattr(value, 'close'):
+            value.close()
+        del value
+
+        counts_before = dict(request_counts)
+        start = time.perf_counter()
+        value = run()
+        duration = time.perf_counter() - start
+
+    requests_made = {
+        endpoint: count - counts_before.get(endpoint, 0)
+        for endpoint, count in request_counts.items()
+        if count - counts_before.get(endpoint, 0)
+    }
+    results.append({
+        'stage': stage,
+        'seconds': duration,
+        'requests': requests_made,
+        'peak_memory_mb': peak / 1024 / 1024,
+    })
+    return value
+
+def measure_startup(stage, command, runs=5):
+    """Best wall time of a fresh interpreter running the command, which includes the interpreter startup"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    results.append({'stage': stage, 'seconds': best, 'requests': {}, 'peak_memory_mb': None})
+
+def print_results():
+    print("="*90)
+    print(f"{'STAGE':<40} {'TIME':>10} {'PEAK MEM':>12} {'REQUESTS':>10}")
+    print("="*90)
+    for result in results:
+        total_requests = sum(result['requests'].values())
+        peak_memory = '-' if result['peak_memory_mb'] is None else f"{result['peak_memory_mb']:.1f}MB"
+        print(f"{result['stage']:<40} {result['seconds'] * 1000:>8.1f}ms {peak_memory:>12} {total_requests:>10}")
+        for endpoint, count in sorted(result['requests'].items()):
+            print(f"    {endpoint}: {count}")
+
+def main():
+    parser = argparse.ArgumentParser(description='TraceTracks - Offline Benchmark')
+    parser.add_argument('--sizes', type=str, default='10000,100000',
+                        help='Sizes of the synthetic storages, comma separated (default: 10000,100000)')
+    parser.add_argument('--tracks', type=int, default=250, help='Number of tracks of the fake artist (default: 250)')
+    parser.add_argument('--num-tracks', type=int, default=20,
+                        help='Number of tracks searched by the full run (default: 20)')
+    parser.add_argument('--workers', type=int, default=1, help='Workers of the full run (default: 1)')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Simulated latency of each API request, in milliseconds (default: 0)')
+    parser.add_argument('--json', type=str, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    latency = args.latency / 1000
+    json_path = os.path.abspath(args.json) if args.json else None
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, script_dir)
+
+    # Everything happens in a temporary directory: storage/, the cache and the API key file
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        with open('youtube_api.key', 'w', encoding='utf-8') as file:
+            file.write('benchmark')
+
+        # Startup, in fresh interpreters: these include the ~40ms of the Python startup itself
+        measure_startup('python (empty)', ['-c', 'pass'])
+        measure_startup('tracetracks.py --help', [os.path.join(script_dir, 'tracetracks.py'), '--help'])
+        measure_startup('import tracetracks', ['-c', f'import sys; sys.path.insert(0, {script_dir!r}); import tracetracks'])
+
+        import tracetracks
+        import analyze_storage
+
+        tracetracks.youtube = FakeYouTube(latency)
+        tracetracks.http_session = FakeSoundCloudSession(args.tracks, latency)
+        tracetracks.configure_rate_limits(0, 0)
+
+        # Storage
+        for size in sizes:
+            generate_store('storage/links_info.txt', size)
+            video_data = measure(f'load_existing_data ({size:,})', tracetracks.load_existing_data)
+            measure(f'save_video_data ({size:,})', tracetracks.save_video_data, video_data)
+            del video_data
+            measure(f'analyze_storage ({size:,})', analyze_storage.analyze_storage)
+            measure(f'TextStore index build ({size:,})', tracetracks.TextStore,
+                    setup=lambda: remove_files('storage/links_info.idx')).close()
+            text_store = measure(f'TextStore index load ({size:,})', tracetracks.TextStore)
+            measure(f'TextStore 1,000 lookups ({size:,})',
+                    lambda: [text_store.get(f'syn{i:08}') for i in range(0, size, max(1, size // 1000))])
+            text_store.close()
+            os.remove('storage/links_info.idx')
+            video_store = measure(f'VideoStore import ({size:,})', tracetracks.open_storage, 'sqlite',
+                                  setup=lambda: remove_files(*DATABASE_FILES))
+            measure(f'VideoStore text export ({size:,})', video_store.export_text)
+            video_store.close()
+            remove_files(*DATABASE_FILES)
+
+        # APIs
+        measure('get_soundcloud_tracks', tracetracks.get_soundcloud_tracks, '1234', 'bench', '1700000000')
+        measure('search_videos (10 queries)', lambda: [tracetracks.search_videos(f'Track {i} Bench Artist') for i in range(10)])
+
+        # Full run, on the smallest storage
+        def reset_storage():
+            remove_files(*DATABASE_FILES, 'storage/checkpoint.json')
+            generate_store('storage/links_info.txt', sizes[0] if sizes else 0)
+
+        measure(
+            f'main (popular, {args.num_tracks} tracks, {args.workers} workers)', tracetracks.main,
+            username='bench-artist', client_id='bench', sort_by='popular', num_tracks=args.num_tracks,
+            workers=args.workers, setup=reset_storage
+        )
+
+        os.chdir('/')
+
+    print_results()
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {json_path}")
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,483 @@
-from googleapiclient.discovery import build
-import requests
+# googleapiclient, httplib2 and requests are imported when first needed, they take most of the startup time
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from array import array
+import itertools
+import threading
+import queue
+import sqlite3
+import json
+import shlex
+import random
+import hashlib
+import bisect
+import functools
+import contextlib
+import time
 import re
 import os
 import argparse
+import mmap
+import sys
 
 # --- API ---
-youtube_api_key = open('youtube_api.key', encoding='utf-8').read()
-if not youtube_api_key.strip():
-    print("Error: youtube_api.key file is empty or not found!")
-    print("Please fill in the youtube_api.key file with your YouTube API key.")
-    exit(1)
-youtube = build('youtube', 'v3', developerKey=youtube_api_key)
+# youtube_api.key can hold several keys, one per line: the next one is used when the quota of a key is exceeded
+# The key file is read and the client is built on first use, so importing the script or --help stays fast
+youtube_api_keys = None
+youtube_key_index = 0
+youtube = None
+youtube_lock = threading.Lock()
+
+def load_youtube_keys():
+    """Read the API keys of youtube_api.key, exits if there are none"""
+    keys = []
+    if os.path.exists('youtube_api.key'):
+        with open('youtube_api.key', encoding='utf-8') as file:
+            keys = [key.strip() for key in file.read().splitlines() if key.strip()]
+    if not keys:
+        print("Error: youtube_api.key file is empty or not found!")
+        print("Please fill in the youtube_api.key file with your YouTube API key.")
+        exit(1)
+    return keys
+
+def build_youtube(key):
+    from googleapiclient.discovery import build
+    # Uses the discovery document shipped with googleapiclient instead of downloading it
+    return build('youtube', 'v3', developerKey=key, static_discovery=True, cache_discovery=False)
+
+def get_youtube():
+    """The YouTube client, built with the first API key on first use"""
+    global youtube, youtube_api_keys
+    if youtube is None:
+        with youtube_lock:
+            if youtube is None:
+                youtube_api_keys = load_youtube_keys()
+                youtube = build_youtube(youtube_api_keys[youtube_key_index])
+    return youtube
+
 # Must be signed to a SoundCloud account to get the client_id.
 # You can get it from the browser's developer tools, in the Network tab, when you load a SoundCloud page.
 # And then, look at the different requests and try to find one that has a "client_id" parameter in the URL.
 
+# --- Instrumentation ---
+class Metrics:
+    """
+    Timing spans and counters of a run (API calls, cache hits, retries, quota units...).
+    Safe to use from several worker threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.spans = {}      # name -> [calls, total seconds, max seconds]
+            self.counters = {}
+            self.artists = []    # cost of each artist of the run
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                span = self.spans.setdefault(name, [0, 0.0, 0.0])
+                span[0] += 1
+                span[1] += duration
+                span[2] = max(span[2], duration)
+
+    def timed(self, name):
+        """Decorator recording each call of a function as a span"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return time.perf_counter(), dict(self.counters)
+
+    def record_artist(self, artist, snapshot):
+        """Record the counters and duration of an artist since the snapshot taken before processing it"""
+        start, counters_before = snapshot
+        with self.lock:
+            self.artists.append({
+                'artist': artist,
+                'seconds': round(time.perf_counter() - start, 3),
+                'counters': {
+                    name: value - counters_before.get(name, 0)
+                    for name, value in self.counters.items()
+                    if value - counters_before.get(name, 0)
+                },
+            })
+
+    def report(self):
+        with self.lock:
+            return {
+                'started_at': self.started_at,
+                'total_seconds': round(time.time() - self.started_at, 3),
+                'spans': {
+                    name: {'calls': calls, 'total_seconds': round(total, 4), 'max_seconds': round(longest, 4)}
+                    for name, (calls, total, longest) in sorted(self.spans.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+                'artists': list(self.artists),
+            }
+
+    def print_summary(self):
+        report = self.report()
+        print("\n" + "="*60)
+        print("PERFORMANCE REPORT")
+        print("="*60)
+        print(f"Total time: {report['total_seconds']:.1f}s")
+        if report['spans']:
+            print(f"\n{'Stage':<28} {'Calls':>6} {'Total':>10} {'Avg':>10} {'Max':>10}")
+            for name, span in report['spans'].items():
+                average = span['total_seconds'] / span['calls'] * 1000
+                print(f"{name:<28} {span['calls']:>6} {span['total_seconds'] * 1000:>8.0f}ms "
+                      f"{average:>8.1f}ms {span['max_seconds'] * 1000:>8.1f}ms")
+        if report['counters']:
+            print("\nCounters:")
+            for name, value in report['counters'].items():
+                print(f"  {name}: {value:,}")
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+metrics = Metrics()
+
+# --- Rate Limiting ---
+class RateLimiter:
+    """Spaces out calls so that at most `rate` of them start per second (0 = unlimited)"""
+
+    def __init__(self, rate=0):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            metrics.count('rate_limit.wait_ms', int(wait_time * 1000))
+            time.sleep(wait_time)
+
+youtube_limiter = RateLimiter(10)
+
+# SoundCloud requests are limited per host (soundcloud.com, api-v2.soundcloud.com, ...)
+soundcloud_host_rps = 5
+host_limiters = {}
+host_limiters_lock = threading.Lock()
+
+def configure_rate_limits(youtube_rps=10, soundcloud_rps=5):
+    """Set the requests-per-second ceilings for the YouTube API and for each SoundCloud host (0 = unlimited)"""
+    global youtube_limiter, soundcloud_host_rps
+    youtube_limiter = RateLimiter(youtube_rps)
+    soundcloud_host_rps = soundcloud_rps
+    with host_limiters_lock:
+        host_limiters.clear()
+
+def get_host_limiter(url):
+    host = urlparse(url).netloc
+    with host_limiters_lock:
+        if host not in host_limiters:
+            host_limiters[host] = RateLimiter(soundcloud_host_rps)
+        return host_limiters[host]
+
+# --- HTTP Client ---
+# Responses worth retrying: rate limited or server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+http_session = None
+http_timeout = 10
+http_max_retries = 4
+
+def configure_http(pool_size=10, timeout=10, max_retries=4):
+    """Create the shared HTTP session, keeping up to `pool_size` connections alive per host"""
+    import requests
+    global http_session, http_timeout, http_max_retries
+    if http_session:
+        http_session.close()
+    http_session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    http_session.mount('https://', adapter)
+    http_session.mount('http://', adapter)
+    http_timeout = timeout
+    http_max_retries = max_retries
+
+# Longest wait before a retry, in seconds, even if the server asks for more
+MAX_RETRY_DELAY = 60
+
+def get_retry_delay(attempt, retry_after=None):
+    """Seconds to wait before the next attempt: the Retry-After header if any, else exponential backoff with jitter"""
+    if retry_after:
+        try:
+            return max(0.0, min(float(retry_after), MAX_RETRY_DELAY))
+        except ValueError:
+            pass
+    return min(MAX_RETRY_DELAY, 2 ** attempt) * random.uniform(0.5, 1.5)
+
+def http_get(url, **kwargs):
+    """
+    GET a URL with the shared session, respecting the per-host rate limit.
+    Rate limited (429), server error (5xx) and failed connections are retried with backoff.
+    Returns the last response, or raises the last connection error.
+    """
+    import requests
+    if http_session is None:
+        configure_http()
+    kwargs.setdefault('timeout', http_timeout)
+    host = urlparse(url).netloc
+    limiter = get_host_limiter(url)
+
+    for attempt in range(http_max_retries + 1):
+        if attempt:
+            metrics.count('retries.soundcloud')
+        limiter.wait()
+        metrics.count('api.soundcloud')
+        try:
+            with metrics.span(f'http {host}'):
+                response = http_session.get(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if attempt == http_max_retries:
+                raise
+            delay = get_retry_delay(attempt)
+            print(f"Warning: Request to {host} failed ({e}), retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == http_max_retries:
+                return response
+            delay = get_retry_delay(attempt, response.headers.get('Retry-After'))
+            print(f"Warning: {host} answered {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+# --- YouTube Quota ---
+# Quota units consumed by each YouTube API method
+YOUTUBE_QUOTA_COSTS = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+}
+
+# Estimated cost of a track: two searches and the details of their results
+TRACK_QUOTA_COST = 2 * YOUTUBE_QUOTA_COSTS['search.list'] + 2 * YOUTUBE_QUOTA_COSTS['videos.list']
+
+class QuotaExceeded(Exception):
+    """
+    The quota budget of the run is spent, or every API key has exceeded its daily quota.
+    pending_tracks holds the tracks that couldn't be searched, when raised by process_artist().
+    """
+
+    def __init__(self, message, pending_tracks=None):
+        super().__init__(message)
+        self.pending_tracks = pending_tracks or []
+
+class QuotaScheduler:
+    """Keeps the YouTube quota units spent during the run under a budget (None = unlimited)"""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.spent = 0
+        self.lock = threading.Lock()
+
+    def reserve(self, method):
+        """Account for a request before sending it, raises QuotaExceeded if it doesn't fit in the budget"""
+        cost = YOUTUBE_QUOTA_COSTS.get(method, 1)
+        with self.lock:
+            if self.budget is not None and self.spent + cost > self.budget:
+                raise QuotaExceeded(f"Quota budget of {self.budget} units reached")
+            self.spent += cost
+
+    def remaining(self):
+        with self.lock:
+            return None if self.budget is None else self.budget - self.spent
+
+quota = QuotaScheduler()
+
+def configure_quota(budget=None):
+    global quota
+    quota = QuotaScheduler(budget)
+
+def is_quota_error(error):
+    """403 errors caused by the daily quota of the API key"""
+    return error.resp.status == 403 and (b'quotaExceeded' in error.content or b'dailyLimitExceeded' in error.content)
+
+def rotate_youtube_key(failed_index):
+    """
+    Switch to the key after failed_index (the index of the key whose quota is exceeded), returns False if there are no more keys.
+    If another worker already switched away from that key, the current key is kept.
+    """
+    global youtube, youtube_key_index
+    with youtube_lock:
+        if youtube_key_index != failed_index:
+            return True
+        if youtube_key_index + 1 >= len(youtube_api_keys or []):
+            return False
+        youtube_key_index += 1
+        youtube = build_youtube(youtube_api_keys[youtube_key_index])
+    print(f"Quota of API key #{youtube_key_index} exceeded, switching to key #{youtube_key_index + 1}")
+    metrics.count('youtube.key_rotations')
+    return True
+
+# httplib2 (used by googleapiclient) is not thread-safe, so each worker thread gets its own connection
+_thread_local = threading.local()
+
+def execute_youtube(make_request, method):
+    """
+    Execute a YouTube API request (method is its name, like 'search.list'), respecting the rate limit and the quota budget.
+    make_request builds the request from the current client, so it can be rebuilt with the next API key.
+    Rate limited (429) and server error (5xx) responses are retried with backoff.
+    Raises QuotaExceeded when the budget is spent or when every API key has exceeded its quota.
+    """
+    import httplib2
+    from googleapiclient.errors import HttpError
+    if not hasattr(_thread_local, 'http'):
+        _thread_local.http = httplib2.Http(timeout=http_timeout)
+    attempt = 0
+    while True:
+        youtube_limiter.wait()
+        quota.reserve(method)
+        metrics.count(f'api.youtube.{method}')
+        metrics.count('youtube.quota_units', YOUTUBE_QUOTA_COSTS.get(method, 1))
+        key_index = youtube_key_index
+        try:
+            with metrics.span(f'youtube {method}'):
+                return make_request().execute(http=_thread_local.http)
+        except HttpError as e:
+            if is_quota_error(e):
+                if rotate_youtube_key(key_index):
+                    continue
+                raise QuotaExceeded("The daily quota of every YouTube API key is exceeded")
+            if e.resp.status not in RETRY_STATUSES or attempt == http_max_retries:
+                raise
+            delay = get_retry_delay(attempt, e.resp.get('retry-after'))
+            print(f"Warning: YouTube API answered {e.resp.status}, retrying in {delay:.1f}s")
+        attempt += 1
+        metrics.count('retries.youtube')
+        time.sleep(delay)
+
+# --- Response Cache ---
+# Time to live of the cached responses, in seconds
+CACHE_TTLS = {
+    'app_version': 6 * 3600,
+    'user_id': 30 * 24 * 3600,          # username -> artist ID
+    'link_id': 30 * 24 * 3600,          # profile link -> artist ID
+    'tracks_page': 6 * 3600,            # a page of an artist's tracks
+    'youtube_search': 12 * 3600,        # query -> video IDs
+    'youtube_video': 3600,              # video ID -> snippet and statistics (view counts change quickly)
+    'youtube_channel': 7 * 24 * 3600,   # channel ID -> snippet and statistics
+}
+
+class ResponseCache:
+    """
+    On-disk cache of API responses, keyed by endpoint and parameters.
+    Entries expire after the endpoint's TTL, and the least recently used ones are evicted above `max_entries`.
+    With `refresh`, cached entries are ignored but fresh responses are still stored.
+    """
+
+    def __init__(self, path='storage/cache.db', max_entries=50000, refresh=False):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, stored_at REAL, accessed_at REAL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        return endpoint + ':' + json.dumps(params, sort_keys=True)
+
+    def get_many(self, endpoint, params_list):
+        """Return a dict of the cached values that are still fresh, keyed by their position in `params_list`"""
+        if self.refresh or not params_list:
+            return {}
+        keys = [self.make_key(endpoint, params) for params in params_list]
+        now = time.time()
+        oldest = now - CACHE_TTLS.get(endpoint, 0)
+        found = {}
+        with self.lock:
+            # SQLite limits the number of variables per statement
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f'SELECT key, value FROM cache WHERE key IN ({placeholders}) AND stored_at >= ?', chunk + [oldest]
+                ).fetchall()
+                found.update(rows)
+                self.conn.executemany('UPDATE cache SET accessed_at = ? WHERE key = ?', [(now, key) for key, _ in rows])
+            self.conn.commit()
+        metrics.count('cache.hits', len(found))
+        metrics.count('cache.misses', len(keys) - len(found))
+        return {i: json.loads(found[key]) for i, key in enumerate(keys) if key in found}
+
+    def get(self, endpoint, params):
+        return self.get_many(endpoint, [params]).get(0)
+
+    def set_many(self, endpoint, items):
+        """Store a list of (params, value) pairs"""
+        now = time.time()
+        rows = [(self.make_key(endpoint, params), json.dumps(value), now, now) for params, value in items]
+        with self.lock:
+            self.conn.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+            self.writes += len(rows)
+            if self.writes >= 100:
+                self.writes = 0
+                self._evict()
+            self.conn.commit()
+
+    def set(self, endpoint, params, value):
+        self.set_many(endpoint, [(params, value)])
+
+    def _evict(self):
+        count = self.conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+    def close(self):
+        with self.lock:
+            self._evict()
+            self.conn.commit()
+            self.conn.close()
+
+# Disabled until configure_cache() is called
+response_cache = None
+
+def configure_cache(enabled=True, refresh=False, max_entries=50000):
+    """Enable the on-disk response cache (or disable it with enabled=False)"""
+    global response_cache
+    if response_cache:
+        response_cache.close()
+    response_cache = ResponseCache(max_entries=max_entries, refresh=refresh) if enabled else None
+
+def cache_get(endpoint, params):
+    return response_cache.get(endpoint, params) if response_cache else None
+
+def cache_set(endpoint, params, value):
+    if response_cache:
+        response_cache.set(endpoint, params, value)
+
 # --- Single Key Input ---
 def get_single_key():
     """Get a single key press without requiring Enter - cross-platform"""
@@ -78,59 +541,356 @@ def clean_title(title: str) -> str:
 
     return title.strip()
 
+# --- Records ---
+YOUTUBE_WATCH_URL = 'https://www.youtube.com/watch?v='
+
+class Track:
+    """A SoundCloud track. link is the permalink without https://soundcloud.com/"""
+    __slots__ = ('title', 'author', 'link', 'playback_count', 'created_at')
+
+    def __init__(self, title, author, link, playback_count=0, created_at=''):
+        self.title = title
+        # An artist's name is repeated on each of their tracks, interning keeps a single copy
+        self.author = sys.intern(author)
+        self.link = link
+        self.playback_count = playback_count or 0
+        self.created_at = created_at or ''
+
+    def to_dict(self):
+        return {'title': self.title, 'author': self.author, 'link': self.link,
+                'playback_count': self.playback_count, 'created_at': self.created_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['title'], data['author'], data['link'], data.get('playback_count', 0), data.get('created_at', ''))
+
+class Video:
+    """
+    A YouTube video. Only the video ID is kept, the link is rebuilt when needed (links that aren't
+    youtube.com/watch links are kept whole as the ID). Views are always an int and channel names are interned.
+    channel_id identifies the channel (author is only its current name), None for videos stored without it.
+    """
+    __slots__ = ('video_id', 'title', 'views', 'author', 'channel_id')
+
+    def __init__(self, video_id, title, views, author, channel_id=None):
+        self.video_id = video_id
+        self.title = title
+        self.views = int(views)
+        self.author = sys.intern(author)
+        self.channel_id = sys.intern(channel_id) if channel_id else None
+
+    @property
+    def link(self):
+        return self.link_from_id(self.video_id)
+
+    @staticmethod
+    def link_from_id(video_id):
+        return video_id if '://' in video_id else YOUTUBE_WATCH_URL + video_id
+
+    @staticmethod
+    def id_from_link(link):
+        return link[len(YOUTUBE_WATCH_URL):] if link.startswith(YOUTUBE_WATCH_URL) else link
+
+    @classmethod
+    def from_link(cls, link, title, views, author, channel_id=None):
+        return cls(cls.id_from_link(link), title, views, author, channel_id)
+
+    def to_dict(self):
+        data = {'title': self.title, 'views': self.views, 'author': self.author, 'link': self.link}
+        if self.channel_id:
+            data['channel_id'] = self.channel_id
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls.from_link(data['link'], data['title'], data['views'], data['author'], data.get('channel_id'))
+
+class VideoColumns:
+    """
+    Column-oriented collection of videos for bulk analytics: the views in an int64 array, the channels as int32 codes
+    into `authors`, and the IDs and titles in lists, without an object per video.
+    Channels are told apart by their ID when known (else by name), and named after their latest name.
+    """
+    __slots__ = ('video_ids', 'titles', 'views', 'author_codes', 'authors', 'channel_ids', 'codes_by_channel')
+
+    def __init__(self, videos=()):
+        self.video_ids = []
+        self.titles = []
+        self.views = array('q')
+        self.author_codes = array('i')
+        self.authors = []
+        self.channel_ids = []
+        self.codes_by_channel = {}
+        for video in videos:
+            self.append(video)
+
+    def append(self, video):
+        channel = video.channel_id or video.author
+        code = self.codes_by_channel.get(channel)
+        if code is None:
+            code = self.codes_by_channel[channel] = len(self.authors)
+            self.authors.append(video.author)
+            self.channel_ids.append(video.channel_id)
+        else:
+            self.authors[code] = video.author
+        self.video_ids.append(video.video_id)
+        self.titles.append(video.title)
+        self.views.append(video.views)
+        self.author_codes.append(code)
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, i):
+        code = self.author_codes[i]
+        return Video(self.video_ids[i], self.titles[i], self.views[i], self.authors[code], self.channel_ids[code])
+
+    def __iter__(self):
+        for i in range(len(self.views)):
+            yield self[i]
+
+# --- Video Details ---
+# videos.list accepts up to 50 comma-separated IDs and costs 1 quota unit per request
+VIDEOS_PER_REQUEST = 50
+
+def get_video_details(video_ids: list, failed: list = None) -> dict:
+    """
+    Fetch snippet and statistics for many videos at once, 50 IDs per request.
+    The IDs of the requests that failed are added to `failed` if given, as they may exist.
+    """
+    details = {}
+    if response_cache:
+        cached = response_cache.get_many('youtube_video', video_ids)
+        details = {video_ids[i]: item for i, item in cached.items()}
+        video_ids = [video_id for video_id in video_ids if video_id not in details]
+
+    for i in range(0, len(video_ids), VIDEOS_PER_REQUEST):
+        chunk = video_ids[i:i + VIDEOS_PER_REQUEST]
+        try:
+            response = execute_youtube(lambda: get_youtube().videos().list(
+                part='snippet,statistics',
+                id=','.join(chunk)
+            ), 'videos.list')
+        except QuotaExceeded:
+            raise
+        except Exception as e:
+            print(f"Warning: Could not get the details of {len(chunk)} videos: {e}")
+            if failed is not None:
+                failed.extend(chunk)
+            continue
+        items = response.get('items', [])
+        for item in items:
+            details[item['id']] = item
+        if response_cache:
+            response_cache.set_many('youtube_video', [(item['id'], item) for item in items])
+    return details
+
+# --- Channel Details ---
+# channels.list also accepts up to 50 IDs and costs 1 quota unit per request
+CHANNELS_PER_REQUEST = 50
+
+def get_channel_details(channel_ids: list, workers: int = 1) -> dict:
+    """
+    Fetch snippet and statistics for many channels, 50 IDs per request, with up to `workers` requests in parallel.
+    When the quota runs out, the requests left are skipped and the details already fetched are returned.
+    """
+    details = {}
+    if response_cache:
+        cached = response_cache.get_many('youtube_channel', channel_ids)
+        details = {channel_ids[i]: item for i, item in cached.items()}
+        channel_ids = [channel_id for channel_id in channel_ids if channel_id not in details]
+
+    quota_error = []
+
+    def fetch(chunk):
+        if quota_error:
+            return []
+        try:
+            response = execute_youtube(lambda: get_youtube().channels().list(
+                part='snippet,statistics',
+                id=','.join(chunk)
+            ), 'channels.list')
+        except QuotaExceeded as e:
+            quota_error.append(e)
+            return []
+        except Exception as e:
+            print(f"Warning: Could not get the details of {len(chunk)} channels: {e}")
+            return []
+        return response.get('items', [])
+
+    chunks = [channel_ids[i:i + CHANNELS_PER_REQUEST] for i in range(0, len(channel_ids), CHANNELS_PER_REQUEST)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for items in executor.map(fetch, chunks):
+            for item in items:
+                details[item['id']] = item
+            if response_cache:
+                response_cache.set_many('youtube_channel', [(item['id'], item) for item in items])
+    if quota_error:
+        skipped = sum(1 for channel_id in channel_ids if channel_id not in details)
+        print(f"Warning: Details of {skipped} channels skipped: {quota_error[0]}")
+    return details
+
 # --- Search Videos ---
-def search_videos(query: str) -> list:
-    search_response = youtube.search().list(
+def search_video_ids(query: str) -> list:
+    """Get the IDs of the videos found by a YouTube search"""
+    video_ids = cache_get('youtube_search', query)
+    if video_ids is not None:
+        return video_ids
+
+    search_response = execute_youtube(lambda: get_youtube().search().list(
         q=query,
         part='id,snippet',
         maxResults=50,
         type='video'
-    ).execute()
+    ), 'search.list')
 
-    videos = []
+    video_ids = []
     for search_result in search_response.get('items', []):
-        try:
-            video_id = search_result['id']['videoId']
-            video_details = youtube.videos().list(
-                part='snippet,statistics',
-                id=video_id
-            ).execute()
+        video_id = search_result.get('id', {}).get('videoId')
+        if video_id and video_id not in video_ids:
+            video_ids.append(video_id)
+    cache_set('youtube_search', query, video_ids)
+    return video_ids
 
-            if video_details['items']:
-                if query.lower() not in video_details['items'][0]['snippet']['description'].lower():
+def filter_videos(query: str, video_ids: list, video_details: dict) -> list:
+    """Keep the videos whose description contains the query, as Video records"""
+    videos = []
+    for video_id in video_ids:
+        try:
+            video_info = video_details.get(video_id)
+            if video_info:
+                if query.lower() not in video_info['snippet']['description'].lower():
                     continue
-                video_info = video_details['items'][0]
                 video_title = video_info['snippet']['title']
                 video_views = video_info['statistics']['viewCount']
                 video_author = video_info['snippet']['channelTitle']
-                video_link = f'https://www.youtube.com/watch?v={video_id}'
-                videos.append({
-                    'title': video_title,
-                    'views': video_views,
-                    'author': video_author,
-                    'link': video_link
-                })
+                channel_id = video_info['snippet'].get('channelId')
+                videos.append(Video(video_id, video_title, video_views, video_author, channel_id))
         except:
             pass
     return videos
 
+@metrics.timed('search_videos')
+def search_videos(query: str) -> list:
+    # Collect the IDs of the whole search page first, then resolve them in batches
+    video_ids = search_video_ids(query)
+
+    video_details = get_video_details(video_ids)
+
+    return filter_videos(query, video_ids, video_details)
+
+# --- Query Planner ---
+def normalize_query(query: str) -> str:
+    """Queries that only differ by case, punctuation or spacing give the same results"""
+    return ' '.join(re.findall(r'\w+', query.lower()))
+
+class QueryPlanner:
+    """
+    Deduplicates the YouTube searches of a run and shares their results.
+    Each normalized query is searched once, and each video is detailed once, even when it's found
+    by several queries: it's then credited to all of them. Safe to use from several worker threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.searches = {}  # normalized query -> Future of the video IDs
+        self.details = {}   # video ID -> Future of the video details (None if not found)
+        self.requested_searches = 0
+        self.requested_videos = 0
+        # Searches and video details actually requested, failed ones included
+        self.sent_searches = 0
+        self.sent_videos = 0
+
+    @metrics.timed('search_videos')
+    def search(self, query: str) -> list:
+        """Same as search_videos(), reusing the searches and video details already done during this run"""
+        key = normalize_query(query)
+        with self.lock:
+            self.requested_searches += 1
+            search = self.searches.get(key)
+            owner = search is None
+            if owner:
+                search = self.searches[key] = Future()
+                self.sent_searches += 1
+        if owner:
+            try:
+                search.set_result(search_video_ids(query))
+            except Exception as e:
+                # Not kept for the rest of the run: the next identical query searches again
+                with self.lock:
+                    del self.searches[key]
+                search.set_exception(e)
+        video_ids = search.result()
+
+        with self.lock:
+            self.requested_videos += len(video_ids)
+            missing = [video_id for video_id in video_ids if video_id not in self.details]
+            for video_id in missing:
+                self.details[video_id] = Future()
+            self.sent_videos += len(missing)
+            futures = {video_id: self.details[video_id] for video_id in video_ids}
+        if missing:
+            # Other threads may be waiting for these videos, so their futures are always resolved.
+            # On failure (like QuotaExceeded), the waiting tracks fail too, and the videos can be detailed again later
+            failed = []
+            try:
+                video_details = get_video_details(missing, failed)
+            except BaseException as e:
+                with self.lock:
+                    for video_id in missing:
+                        del self.details[video_id]
+                for video_id in missing:
+                    futures[video_id].set_exception(e)
+                raise
+            if failed:
+                # Not detailed because of an error rather than not found: detailed again by the next query
+                with self.lock:
+                    for video_id in failed:
+                        del self.details[video_id]
+            for video_id in missing:
+                futures[video_id].set_result(video_details.get(video_id))
+
+        video_details = {video_id: futures[video_id].result() for video_id in video_ids}
+        return filter_videos(query, video_ids, video_details)
+
+    def summary(self) -> str:
+        with self.lock:
+            return (f"{self.requested_searches} searches ({self.requested_searches - self.sent_searches} duplicates skipped), "
+                    f"{self.requested_videos} videos found ({self.requested_videos - self.sent_videos} already detailed)")
+
 # --- Get App Version ---
+@metrics.timed('get_app_version')
 def get_app_version() -> str:
+    app_version = cache_get('app_version', {})
+    if app_version:
+        return app_version
+
     headers = {
         'User-Agent': 'Mozilla/5.0',
     }
-    response = requests.get('https://soundcloud.com/versions.json', headers=headers).json()
-    return response['app']
+    response = http_get('https://soundcloud.com/versions.json', headers=headers)
+    if response.status_code != 200:
+        print(f"Error: {response.status_code} - {response.text}")
+        return None
+
+    app_version = response.json()['app']
+    cache_set('app_version', {}, app_version)
+    return app_version
 
 # --- Search by Username ---
+@metrics.timed('resolve_artist')
 def search_by_username(username: str, client_id: str, app_version: str) -> str:
+    user_id = cache_get('user_id', username)
+    if user_id:
+        return user_id
+
     headers = {
         'User-Agent': 'Mozilla/5.0',
     }
 
     url = f'https://api-v2.soundcloud.com/search?q={username}&client_id={client_id}&limit=1&app_version={app_version}'
 
-    response = requests.get(url, headers=headers)
+    response = http_get(url, headers=headers)
     if response.status_code != 200:
         print(f"Error: {response.status_code} - {response.text}")
         return None
@@ -139,15 +899,21 @@ def search_by_username(username: str, client_id: str, app_version: str) -> str:
     # print(data)
     if 'collection' in data and len(data['collection']) > 0:
         user_id = data['collection'][0]['id']
+        cache_set('user_id', username, user_id)
         return user_id
 
 # --- Get ID from a SoundCloud Link ---
+@metrics.timed('resolve_artist')
 def get_id_from_link(link: str) -> str:
+    user_id = cache_get('link_id', link)
+    if user_id:
+        return user_id
+
     headers = {
         'User-Agent': 'Mozilla/5.0',
     }
 
-    response = requests.get(link, headers=headers)
+    response = http_get(link, headers=headers)
     if response.status_code != 200:
         print(f"Error: {response.status_code} - {response.text}")
         return None
@@ -155,10 +921,18 @@ def get_id_from_link(link: str) -> str:
     match = re.search(r'soundcloud://users:(\d+)', response.text)
     if match:
         user_id = match.group(1)
+        cache_set('link_id', link, user_id)
         return user_id
 
 # --- Get SoundCloud tracks ---
-def get_soundcloud_tracks(user_id: str, client_id: str, app_version: str) -> list:
+class SoundCloudError(Exception):
+    """A page of an artist's tracks couldn't be fetched after the first one: the track list would be incomplete"""
+
+def iter_soundcloud_pages(user_id: str, client_id: str, app_version: str):
+    """
+    Yield the pages of an artist's tracks (most recent first), following next_href until the last page.
+    Yields nothing if the first page fails, and raises SoundCloudError if a later page does.
+    """
     headers = {
         'User-Agent': 'Mozilla/5.0',
     }
@@ -173,226 +947,1415 @@ def get_soundcloud_tracks(user_id: str, client_id: str, app_version: str) -> lis
         'app_locale': 'en',
     }
 
-    response = requests.get(f'https://api-v2.soundcloud.com/users/{user_id}/tracks', params=params, headers=headers).json()
-    tracks = []
-    # print(response)
-    for track in response['collection']:
-        tracks.append({
-            'title': clean_title(track['title']),
-            'author': track['user']['username'],
-            'link': track['permalink_url'][23:],
-            'playback_count': track.get('playback_count', 0)
-        })
+    url = f'https://api-v2.soundcloud.com/users/{user_id}/tracks'
+    first_page = True
+    while url:
+        # The client ID and app version don't change the content of the page
+        cache_params = {'url': url, 'offset': params.get('offset'), 'limit': params.get('limit')}
+        response = cache_get('tracks_page', cache_params)
+        if response is None:
+            with metrics.span('fetch_tracks_page'):
+                response = http_get(url, params=params, headers=headers)
+            if response.status_code != 200:
+                if not first_page:
+                    raise SoundCloudError(f"Could not get the next page of tracks: {response.status_code} - {response.text}")
+                print(f"Error: {response.status_code} - {response.text}")
+                return
+            response = response.json()
+            cache_set('tracks_page', cache_params, response)
+        yield response.get('collection', [])
+        first_page = False
+
+        # next_href already carries the offset/limit, but not the client_id
+        url = response.get('next_href')
+        params = {
+            'client_id': client_id,
+            'app_version': app_version,
+            'app_locale': 'en',
+        }
+
+def iter_soundcloud_tracks(user_id: str, client_id: str, app_version: str, prefetch: int = 1):
+    """
+    Yield an artist's tracks (most recent first) as the pages arrive.
+    Up to `prefetch` pages are fetched in the background while the caller consumes the current one.
+    """
+    pages = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        """Queue an item for the caller, returns False if the caller stopped consuming"""
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_pages():
+        try:
+            for page in iter_soundcloud_pages(user_id, client_id, app_version):
+                if not put(page):
+                    return
+            put(done)
+        except Exception as e:
+            put(e)
+
+    fetcher = threading.Thread(target=fetch_pages, daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            page = pages.get()
+            if page is done:
+                break
+            if isinstance(page, Exception):
+                raise page
+            for track in page:
+                yield Track(
+                    clean_title(track['title']),
+                    track['user']['username'],
+                    track['permalink_url'][23:],
+                    track.get('playback_count', 0),
+                    track.get('created_at', '')
+                )
+    finally:
+        # Stop the background fetcher if the caller doesn't need the remaining pages
+        stop.set()
+
+def get_soundcloud_tracks(user_id: str, client_id: str, app_version: str) -> list:
+    """Get all the tracks of an artist, oldest first"""
+    tracks = list(iter_soundcloud_tracks(user_id, client_id, app_version))
     return tracks[::-1]
 
+# --- Track Index ---
+def tokenize(text: str) -> list:
+    return re.findall(r'\w+', text.lower())
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Edit distance between a and b (insertions, deletions, substitutions and swaps of adjacent characters),
+    or max_distance + 1 as soon as it's known to be higher
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        # Both rows are needed to compute the next ones, the distance can't go back down once they're too high
+        if min(current) > max_distance and min(previous) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+class TrackIndex:
+    """
+    Index of an artist's tracks for --song lookups: an inverted index of the title tokens,
+    and a hash map of the permalink slugs. Supports exact, prefix, substring and fuzzy (edit distance) matching.
+    """
+
+    def __init__(self, tracks, tokens=None, slugs=None):
+        self.tracks = tracks
+        self.fingerprint = self.make_fingerprint(tracks)
+        if tokens is None or slugs is None:
+            tokens, slugs = {}, {}
+            for position, track in enumerate(tracks):
+                for token in set(tokenize(track.title)):
+                    tokens.setdefault(token, []).append(position)
+                slugs.setdefault(track.link.split('/')[-1], []).append(position)
+        self.tokens = tokens
+        self.slugs = slugs
+        self.vocabulary = sorted(tokens)
+        self.sorted_slugs = sorted(slugs)
+
+    @staticmethod
+    def make_fingerprint(tracks):
+        return hashlib.sha1('\n'.join(track.link + '|' + track.title for track in tracks).encode('utf-8')).hexdigest()
+
+    def _prefix_positions(self, keys, mapping, prefix):
+        """Positions of all the keys (sorted) of mapping starting with prefix"""
+        positions = set()
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            positions.update(mapping[keys[i]])
+        return positions
+
+    def _fuzzy_positions(self, token):
+        # Short tokens (like track numbers) have to match exactly
+        max_distance = 0 if len(token) <= 2 else 1 if len(token) < 8 else 2
+        positions = set()
+        for candidate in self.vocabulary:
+            if edit_distance(token, candidate, max_distance) <= max_distance:
+                positions.update(self.tokens[candidate])
+        return positions
+
+    def find(self, song: str):
+        """
+        Find the tracks matching a song title or SoundCloud link, in catalog order.
+        Returns (tracks, match) where match is 'exact', 'prefix', 'substring' or 'fuzzy'.
+        The tracks whose title (or link) contains the query are always included, like a plain search.
+        """
+        if song.startswith('https://soundcloud.com/'):
+            slug = song.rstrip('/').split('/')[-1].lower()
+            if slug in self.slugs:
+                return [self.tracks[i] for i in self.slugs[slug]], 'exact'
+            positions = self._prefix_positions(self.sorted_slugs, self.slugs, slug)
+            substring = {i for i, track in enumerate(self.tracks) if slug in track.link.lower()}
+            match = 'prefix' if positions else 'substring'
+            return [self.tracks[i] for i in sorted(positions | substring)], match
+
+        query_tokens = tokenize(song)
+
+        # Every token of the query has to match a token of the title, as a whole word or as a prefix
+        positions = None
+        for token in query_tokens:
+            token_positions = self._prefix_positions(self.vocabulary, self.tokens, token)
+            positions = token_positions if positions is None else positions & token_positions
+        positions = positions or set()
+        # Titles containing the query anywhere, even inside a word ("night" in "Midnight City")
+        song_lower = song.lower()
+        substring = {i for i, track in enumerate(self.tracks) if song_lower in track.title.lower()}
+        if positions or substring:
+            tracks = [self.tracks[i] for i in sorted(positions | substring)]
+            exact = any(track.title.lower() == song_lower for track in tracks)
+            return tracks, 'exact' if exact else 'prefix' if positions else 'substring'
+
+        # Typo-tolerant fallback
+        positions = None
+        for token in query_tokens:
+            token_positions = self._fuzzy_positions(token)
+            positions = token_positions if positions is None else positions & token_positions
+        return [self.tracks[i] for i in sorted(positions or [])], 'fuzzy'
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'fingerprint': self.fingerprint, 'tracks': [track.to_dict() for track in self.tracks],
+                       'tokens': self.tokens, 'slugs': self.slugs}, file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return cls([Track.from_dict(track) for track in data['tracks']], data['tokens'], data['slugs'])
+
+# Indexes used during this run, by artist ID
+track_indexes = {}
+
+def get_track_index(artist_id, tracks):
+    """
+    Get the index of an artist's tracks (oldest first): reused from this run or from storage/index/,
+    and only rebuilt when the catalog has changed
+    """
+    fingerprint = TrackIndex.make_fingerprint(tracks)
+    index = track_indexes.get(artist_id)
+    if index and index.fingerprint == fingerprint:
+        return index
+
+    path = os.path.join('storage', 'index', f'{artist_id}.json')
+    index = None
+    if os.path.exists(path):
+        try:
+            index = TrackIndex.load(path)
+        except (ValueError, KeyError):
+            index = None
+    if not index or index.fingerprint != fingerprint:
+        index = TrackIndex(tracks)
+        index.save(path)
+    track_indexes[artist_id] = index
+    return index
+
 # --- Storage Management ---
+def map_text_file(path):
+    """Memory-map a file of the text storage, returns (mmap or None if the file is empty, newline bytes of the file)"""
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return None, os.linesep.encode()
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    # Files written in text mode on Windows have \r\n newlines
+    newline = b'\r\n' if mm.find(b'\r\n', 0, 4096) != -1 else b'\n'
+    return mm, newline
+
+def iter_text_blocks(mm, newline):
+    """Yield the (offset, length) of each video block of a mapped links_info.txt"""
+    separator = newline * 2
+    size = len(mm)
+    position = 0
+    while position < size:
+        while mm[position:position + len(newline)] == newline:
+            position += len(newline)
+        if position >= size:
+            break
+        end = mm.find(separator, position)
+        if end == -1:
+            end = size
+            while end > position and mm[end - 1] in b'\r\n':
+                end -= 1
+        yield position, end - position
+        position = end + len(separator)
+
+def parse_text_block(data):
+    """Parse a video block (bytes) into a Video, None if it has less than 4 lines. Raises ValueError for invalid views"""
+    lines = data.decode('utf-8').splitlines()
+    if len(lines) < 4:
+        return None
+    title = lines[0].replace('Title: ', '')
+    views = int(lines[1].replace('Views: ', ''))
+    author = lines[2].replace('Author: ', '')
+    link = lines[3].replace('Link: ', '')
+    # Older blocks have no channel ID
+    channel_id = lines[4].replace('Channel ID: ', '') if len(lines) > 4 and lines[4].startswith('Channel ID: ') else None
+    return Video.from_link(link, title, views, author, channel_id)
+
+def format_text_block(video):
+    block = f"Title: {video.title}\nViews: {video.views}\nAuthor: {video.author}\nLink: {video.link}\n"
+    if video.channel_id:
+        block += f"Channel ID: {video.channel_id}\n"
+    return block + "\n"
+
 def load_existing_data():
+    """Load the videos of the text storage, as a dict of video ID -> Video"""
     video_data = {}
     
     if os.path.exists('storage/links_info.txt'):
-        with open('storage/links_info.txt', 'r', encoding='utf-8') as file:
-            content = file.read().strip()
-            if content:
-                video_blocks = content.split('\n\n')
-                for block in video_blocks:
-                    if block.strip():
-                        lines = block.strip().split('\n')
-                        if len(lines) >= 4:
-                            try:
-                                title = lines[0].replace('Title: ', '')
-                                views = int(lines[1].replace('Views: ', ''))
-                                author = lines[2].replace('Author: ', '')
-                                link = lines[3].replace('Link: ', '')
-                                video_data[link] = {
-                                    'title': title,
-                                    'views': views,
-                                    'author': author,
-                                    'link': link
-                                }
-                            except ValueError as e:
-                                print(f"Warning: Could not parse views for block: {block[:50]}...")
-                                continue
+        mm, newline = map_text_file('storage/links_info.txt')
+        if mm is not None:
+            with mm:
+                for offset, length in iter_text_blocks(mm, newline):
+                    try:
+                        video = parse_text_block(mm[offset:offset + length])
+                    except ValueError:
+                        print(f"Warning: Could not parse views for block: {mm[offset:offset + 50].decode('utf-8', 'replace')}...")
+                        continue
+                    if video:
+                        video_data[video.video_id] = video
+    
+    # Videos processed after the last save, if the run was interrupted
+    for video in read_journal():
+        video_data[video.video_id] = video
     return video_data
 
+# With the text storage, each processed video is appended to the journal, which is cleared once the text files are saved
+JOURNAL_FILE = 'storage/links_journal.jsonl'
+
+def append_journal(video):
+    os.makedirs(os.path.dirname(JOURNAL_FILE), exist_ok=True)
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(video.to_dict()) + '\n')
+
+def read_journal():
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    with open(JOURNAL_FILE, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                yield Video.from_dict(json.loads(line))
+            except (ValueError, KeyError):
+                # Last line cut by a crash
+                break
+
+def replace_file(path, write, newline=None):
+    """Write a file through a temporary file renamed over it, so a crash never leaves it truncated"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8', newline=newline) as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
 def save_video_data(video_data):
     """Save video data to files"""
     os.makedirs('storage', exist_ok=True)
     
-    with open('storage/links.txt', 'w', encoding='utf-8') as links_file, \
-        open('storage/links_info.txt', 'w', encoding='utf-8') as info_file:
-        
+    def write_links(links_file):
         for video in video_data.values():
-            links_file.write(video['link'] + '\n')
-            info_file.write(f"Title: {video['title']}\nViews: {video['views']}\nAuthor: {video['author']}\nLink: {video['link']}\n\n")
-
-def process_video(video, video_data):
-    """Process a single video and update storage if necessary"""
-    link = video['link']
-    views = int(video['views'])
+            links_file.write(video.link + '\n')
+    
+    def write_info(info_file):
+        for video in video_data.values():
+            info_file.write(format_text_block(video))
     
-    if link in video_data:
-        existing_views = int(video_data[link]['views']) if isinstance(video_data[link]['views'], str) else video_data[link]['views']
-        if views > existing_views:
-            video_data[link] = video
-            video_data[link]['views'] = views
-            print(f"Updated views for: {video['title']} ({views} views)")
+    replace_file('storage/links.txt', write_links)
+    replace_file('storage/links_info.txt', write_info)
+    if os.path.exists(JOURNAL_FILE):
+        os.remove(JOURNAL_FILE)
+
+class TextStore:
+    """
+    Text storage read through a memory map of links_info.txt, with an index of the offset of each video's block.
+    The index is saved in links_info.idx and reused as long as links_info.txt doesn't change, so only the blocks
+    that are looked up are read and parsed.
+    New videos are appended to the text files and to the index. Higher view counts are kept in memory (and in the
+    journal) until save(), the only time links_info.txt is rewritten.
+    With read_only, nothing is written: the index is built in memory if needed, and close() doesn't save.
+    Supports the same read operations as the dict returned by load_existing_data().
+    """
+
+    def __init__(self, path='storage/links_info.txt', links_path='storage/links.txt', read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.links_path = links_path
+        self.index_path = os.path.splitext(path)[0] + '.idx'
+        self.mm = None
+        self.newline = os.linesep.encode()
+        # Video ID -> number of its block, and offset and length of each block
+        self.positions = {}
+        self.offsets = array('q')
+        self.lengths = array('i')
+        # Videos whose view count is higher than in links_info.txt
+        self.updated = {}
+        # Whether the journal was replayed or written, so save() includes its entries and can remove it
+        self.journaled = False
+        if not read_only:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+        self._map()
+        if not self._load_index():
+            self._build_index()
+            if not read_only:
+                self._write_index()
+
+    def _map(self):
+        if self.mm is not None:
+            self.mm.close()
+        self.mm, newline = map_text_file(self.path)
+        if self.mm is not None:
+            self.newline = newline
+
+    def _index_header(self):
+        """First line of the index: the size and modification time of links_info.txt, fixed width to be updated in place"""
+        stat = os.stat(self.path)
+        return f"{stat.st_size:20} {stat.st_mtime_ns:20}\n"
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'r', encoding='utf-8') as file:
+            if file.readline() != self._index_header():
+                return False
+            for line in file:
+                video_id, offset, length = line.rstrip('\n').split('\t')
+                self.positions[video_id] = len(self.offsets)
+                self.offsets.append(int(offset))
+                self.lengths.append(int(length))
+        return True
+
+    def _build_index(self):
+        self.positions = {}
+        self.offsets = array('q')
+        self.lengths = array('i')
+        if self.mm is None:
+            return
+        for offset, length in iter_text_blocks(self.mm, self.newline):
+            try:
+                video = parse_text_block(self.mm[offset:offset + length])
+            except ValueError:
+                print(f"Warning: Could not parse views for block: {self.mm[offset:offset + 50].decode('utf-8', 'replace')}...")
+                continue
+            if video:
+                self.positions[video.video_id] = len(self.offsets)
+                self.offsets.append(offset)
+                self.lengths.append(length)
+
+    def _write_index(self):
+        def write(file):
+            file.write(self._index_header())
+            for video_id, position in self.positions.items():
+                file.write(f"{video_id}\t{self.offsets[position]}\t{self.lengths[position]}\n")
+        # Always \n newlines, so the header has the same size on every platform
+        replace_file(self.index_path, write, newline='\n')
+
+    def _read(self, position):
+        offset, length = self.offsets[position], self.lengths[position]
+        if self.mm is None or offset + length > len(self.mm):
+            # Appended after the file was mapped
+            self._map()
+        return parse_text_block(self.mm[offset:offset + length])
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, video_id):
+        return video_id in self.positions
+
+    def __getitem__(self, video_id):
+        video = self.updated.get(video_id)
+        if video is None:
+            video = self._read(self.positions[video_id])
+        return video
+
+    def get(self, video_id, default=None):
+        return self[video_id] if video_id in self.positions else default
+
+    def values(self):
+        """Iterate over all the videos, in file order"""
+        for video_id, position in self.positions.items():
+            yield self.updated.get(video_id) or self._read(position)
+
+    def upsert(self, video, artist_id=None, track_link=None):
+        """
+        Add a video, or update it if its view count is higher than the stored one.
+        Returns 'added', 'updated' or None if nothing changed.
+        """
+        existing = self.get(video.video_id)
+        if existing is None:
+            self._append(video)
+            return 'added'
+        if video.views > existing.views:
+            self.updated[video.video_id] = video
+            append_journal(video)
+            self.journaled = True
+            return 'updated'
+        return None
+
+    def _append(self, video):
+        separator = self.newline * 2
+        block = format_text_block(video).replace('\n', self.newline.decode()).encode('utf-8')
+        with open(self.path, 'ab') as file:
+            offset = file.tell()
+            if offset and not self._ends_with(separator):
+                # Complete the separator after the last block
+                prefix = self.newline if self._ends_with(self.newline) else separator
+                file.write(prefix)
+                offset += len(prefix)
+            file.write(block)
+        with open(self.links_path, 'ab') as file:
+            file.write(video.link.encode('utf-8') + self.newline)
+
+        self.positions[video.video_id] = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(len(block) - len(separator))
+        with open(self.index_path, 'a', encoding='utf-8', newline='\n') as file:
+            file.write(f"{video.video_id}\t{offset}\t{len(block) - len(separator)}\n")
+        with open(self.index_path, 'r+b') as file:
+            file.write(self._index_header().encode('utf-8'))
+
+    def _ends_with(self, data):
+        with open(self.path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() < len(data):
+                return False
+            file.seek(-len(data), os.SEEK_END)
+            return file.read() == data
+
+    def replay_journal(self):
+        """Store the videos of the journal left by an interrupted run"""
+        for video in read_journal():
+            existing = self.get(video.video_id)
+            if existing is None:
+                self._append(video)
+            elif video.views > existing.views:
+                self.updated[video.video_id] = video
+        self.journaled = True
+
+    def save(self):
+        """Rewrite links_info.txt if view counts were updated, copying the other blocks as they are"""
+        if self.updated:
+            self._map()
+            separator = self.newline * 2
+            positions = {}
+            offsets = array('q')
+            lengths = array('i')
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as file:
+                for video_id, position in self.positions.items():
+                    video = self.updated.get(video_id)
+                    if video is None:
+                        offset, length = self.offsets[position], self.lengths[position]
+                        block = self.mm[offset:offset + length] + separator
+                    else:
+                        block = format_text_block(video).replace('\n', self.newline.decode()).encode('utf-8')
+                    positions[video_id] = len(offsets)
+                    offsets.append(file.tell())
+                    lengths.append(len(block) - len(separator))
+                    file.write(block)
+                file.flush()
+                os.fsync(file.fileno())
+            # The file must not be mapped while it is replaced (on Windows)
+            self.mm.close()
+            self.mm = None
+            os.replace(temp_path, self.path)
+            self.positions, self.offsets, self.lengths = positions, offsets, lengths
+            self.updated = {}
+            self._map()
+            self._write_index()
+        # A journal that wasn't replayed holds view counts that aren't in links_info.txt yet
+        if self.journaled and os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        self.journaled = False
+
+    def close(self):
+        if not self.read_only:
+            self.save()
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+# --- View History ---
+# The view counts of a video are stored as a blob of (timestamp, views) samples, each encoded as the
+# varint deltas from the previous sample: a few bytes per sample
+def encode_varint(value, out):
+    """Append a signed integer to a bytearray, zigzag + LEB128 encoded"""
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def encode_samples(samples, previous=(0, 0)):
+    """Encode (timestamp, views) samples as deltas, starting from the previous sample"""
+    out = bytearray()
+    last_at, last_views = previous
+    for timestamp, views in samples:
+        encode_varint(timestamp - last_at, out)
+        encode_varint(views - last_views, out)
+        last_at, last_views = timestamp, views
+    return bytes(out)
+
+def decode_samples(blob):
+    """Yield the (timestamp, views) samples of a blob"""
+    values = []
+    value = shift = 0
+    last_at = last_views = 0
+    for byte in blob:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte & 0x80:
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+        if len(values) == 2:
+            last_at += values[0]
+            last_views += values[1]
+            values.clear()
+            yield last_at, last_views
+
+def downsample_samples(samples, now, retention_days=0, daily_after_days=30):
+    """
+    Drop the samples older than retention_days (0 = keep all), and keep only the last sample of each day
+    for the samples older than daily_after_days. The latest sample is always kept.
+    """
+    if not samples:
+        return samples
+    oldest_allowed = now - retention_days * 86400 if retention_days else None
+    daily_before = now - daily_after_days * 86400
+    kept = []
+    for timestamp, views in samples[:-1]:
+        if oldest_allowed is not None and timestamp < oldest_allowed:
+            continue
+        if timestamp < daily_before and kept and kept[-1][0] // 86400 == timestamp // 86400:
+            kept[-1] = (timestamp, views)
+        else:
+            kept.append((timestamp, views))
+    kept.append(samples[-1])
+    return kept
+
+class VideoStore:
+    """
+    SQLite storage of the found videos, keyed by video link and indexed by author, channel ID and views.
+    Each upsert is its own transaction, so the videos are saved as soon as they are processed.
+    Every view count seen is also appended to the video's history, with the artists it was found for,
+    and each channel is indexed with the artists and tracks it reuploads.
+    Supports the same read operations as the dict returned by load_existing_data().
+    """
+
+    def __init__(self, path='storage/tracetracks.db'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Write-ahead log: a commit per video stays cheap, and an interrupted run never corrupts the database
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS videos (link TEXT PRIMARY KEY, title TEXT, views INTEGER, author TEXT)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS videos_author ON videos (author)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS videos_views ON videos (views)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            # last_at and last_views are the last sample of the blob, so a new sample can be appended as a delta
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS view_history '
+                '(video_id TEXT PRIMARY KEY, last_at INTEGER, last_views INTEGER, samples BLOB)'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS video_artists (video_id TEXT, artist TEXT, PRIMARY KEY (video_id, artist)) '
+                'WITHOUT ROWID'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS video_artists_artist ON video_artists (artist)')
+            # Databases created before the channel IDs were stored
+            if 'channel_id' not in [row[1] for row in self.conn.execute('PRAGMA table_info(videos)')]:
+                self.conn.execute('ALTER TABLE videos ADD COLUMN channel_id TEXT')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel_id)')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS channels '
+                '(channel_id TEXT PRIMARY KEY, title TEXT, subscribers INTEGER, video_count INTEGER, updated_at REAL)'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS channel_tracks (channel_id TEXT, artist TEXT, track_link TEXT, video_id TEXT, '
+                'PRIMARY KEY (channel_id, artist, track_link, video_id)) WITHOUT ROWID'
+            )
+            # The videos are linked to the SoundCloud artist IDs, which stay the same when an artist is renamed
+            self.conn.execute('CREATE TABLE IF NOT EXISTS artists (artist_id TEXT PRIMARY KEY, name TEXT)')
+        # Whether videos changed since the last text export, kept in the database in case a run is interrupted
+        self.text_changed = self.conn.execute("SELECT 1 FROM meta WHERE key = 'text_export_pending'").fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
+
+    def __contains__(self, video_id):
+        link = Video.link_from_id(video_id)
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM videos WHERE link = ?', (link,)).fetchone() is not None
+
+    def __getitem__(self, video_id):
+        link = Video.link_from_id(video_id)
+        with self.lock:
+            row = self.conn.execute('SELECT title, views, author, channel_id FROM videos WHERE link = ?', (link,)).fetchone()
+        if row is None:
+            raise KeyError(video_id)
+        return Video(video_id, *row)
+
+    def values(self):
+        """Iterate over all the videos, in insertion order"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT link, title, views, author, channel_id FROM videos ORDER BY rowid')
+        for row in cursor:
+            yield Video.from_link(*row)
+
+    def upsert(self, video, artist_id=None, track_link=None):
+        """
+        Add a video, or update it if its view count is higher than the stored one.
+        The view count is appended to the video's history, and the video is linked to the artist ID and track if given.
+        Returns 'added', 'updated' or None if nothing changed.
+        """
+        with self.lock, self.conn:
+            changes = self.conn.total_changes
+            status = self._upsert(video)
+            if self.conn.total_changes != changes and not self.text_changed:
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('text_export_pending', ?)", (str(time.time()),))
+                self.text_changed = True
+            self._record_views(video.video_id, int(time.time()), video.views)
+            if artist_id:
+                self.conn.execute('INSERT OR IGNORE INTO video_artists VALUES (?, ?)', (video.video_id, artist_id))
+                if track_link and video.channel_id:
+                    self.conn.execute(
+                        'INSERT OR IGNORE INTO channel_tracks VALUES (?, ?, ?, ?)',
+                        (video.channel_id, artist_id, track_link, video.video_id)
+                    )
+            return status
+
+    def _record_views(self, video_id, timestamp, views):
+        row = self.conn.execute(
+            'SELECT last_at, last_views, samples FROM view_history WHERE video_id = ?', (video_id,)
+        ).fetchone()
+        if row is None:
+            self.conn.execute(
+                'INSERT INTO view_history VALUES (?, ?, ?, ?)',
+                (video_id, timestamp, views, encode_samples([(timestamp, views)]))
+            )
+        elif views != row[1]:
+            # The new sample is appended as the deltas from the last one, without decoding the blob
+            samples = row[2] + encode_samples([(timestamp, views)], previous=row[:2])
+            self.conn.execute(
+                'UPDATE view_history SET last_at = ?, last_views = ?, samples = ? WHERE video_id = ?',
+                (timestamp, views, samples, video_id)
+            )
+
+    def history(self, video_id):
+        """The (timestamp, views) samples of a video, oldest first"""
+        with self.lock:
+            row = self.conn.execute('SELECT samples FROM view_history WHERE video_id = ?', (video_id,)).fetchone()
+        return list(decode_samples(row[0])) if row else []
+
+    def compact_history(self, retention_days=0, daily_after_days=30):
+        """Apply downsample_samples() to every history, returns the number of samples removed"""
+        now = int(time.time())
+        removed = 0
+        changes = []
+        with self.lock:
+            for video_id, blob in self.conn.execute('SELECT video_id, samples FROM view_history'):
+                samples = list(decode_samples(blob))
+                kept = downsample_samples(samples, now, retention_days, daily_after_days)
+                if len(kept) < len(samples):
+                    removed += len(samples) - len(kept)
+                    changes.append((encode_samples(kept), video_id))
+            with self.conn:
+                self.conn.executemany('UPDATE view_history SET samples = ? WHERE video_id = ?', changes)
+        return removed
+
+    def _upsert(self, video):
+        link = video.link
+        row = self.conn.execute('SELECT views FROM videos WHERE link = ?', (link,)).fetchone()
+        if row is None:
+            self.conn.execute(
+                'INSERT INTO videos (link, title, views, author, channel_id) VALUES (?, ?, ?, ?, ?)',
+                (link, video.title, video.views, video.author, video.channel_id)
+            )
+            return 'added'
+        if video.views > row[0]:
+            self.conn.execute(
+                'UPDATE videos SET title = ?, views = ?, author = ?, channel_id = COALESCE(?, channel_id) WHERE link = ?',
+                (video.title, video.views, video.author, video.channel_id, link)
+            )
+            return 'updated'
+        if video.channel_id:
+            # Videos stored before the channel IDs were
+            self.conn.execute('UPDATE videos SET channel_id = ? WHERE link = ? AND channel_id IS NULL', (video.channel_id, link))
+        return None
+
+    def save_artist(self, artist_id, name):
+        """Store the current name of an artist"""
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO artists VALUES (?, ?)', (str(artist_id), name))
+
+    def save_channels(self, channels):
+        """Store the details of channels, as returned by channels.list"""
+        now = time.time()
+        rows = [
+            (
+                channel['id'],
+                channel.get('snippet', {}).get('title'),
+                int(channel.get('statistics', {}).get('subscriberCount', 0)),
+                int(channel.get('statistics', {}).get('videoCount', 0)),
+                now,
+            )
+            for channel in channels
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?)', rows)
+
+    def import_text(self):
+        """One-time import of the videos stored in the text files, returns the number of imported videos"""
+        with self.lock:
+            imported = self.conn.execute("SELECT value FROM meta WHERE key = 'text_imported'").fetchone()
+        if imported:
+            return 0
+        videos = load_existing_data()
+        # A single transaction for the whole import
+        with self.lock, self.conn:
+            for video in videos.values():
+                self._upsert(video)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('text_imported', ?)", (str(time.time()),))
+        return len(videos)
+
+    def replay_journal(self):
+        """Store the view counts of the journal left by an interrupted run of the text storage, then remove it"""
+        videos = list(read_journal())
+        if videos:
+            with self.lock, self.conn:
+                changes = self.conn.total_changes
+                for video in videos:
+                    self._upsert(video)
+                if self.conn.total_changes != changes:
+                    self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('text_export_pending', ?)", (str(time.time()),))
+                    self.text_changed = True
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+
+    def text_outdated(self):
+        """Whether links.txt and links_info.txt are missing or older than the videos"""
+        return self.text_changed or not (os.path.exists('storage/links.txt') and os.path.exists('storage/links_info.txt'))
+
+    def export_text(self):
+        """Write links.txt and links_info.txt, for compatibility with the text storage"""
+        save_video_data(self)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key = 'text_export_pending'")
+            self.text_changed = False
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+@metrics.timed('storage_load')
+def open_storage(backend='sqlite'):
+    """Open the video storage: a VideoStore for 'sqlite', or a TextStore of the text files for 'text'"""
+    if backend == 'text':
+        video_data = TextStore()
+        video_data.replay_journal()
+        return video_data
+
+    video_data = VideoStore()
+    imported = video_data.import_text()
+    if imported:
+        print(f"Imported {imported} videos from storage/links_info.txt")
+    video_data.replay_journal()
+    return video_data
+
+@metrics.timed('storage_save')
+def close_storage(video_data, export_text=True, history_retention=None):
+    """
+    Save the text files (if needed) and close the storage. history_retention (days) compacts the view history.
+    With the sqlite storage, the text files are only rewritten if some videos were added or updated since the last export.
+    """
+    if isinstance(video_data, VideoStore):
+        if history_retention is not None:
+            removed = video_data.compact_history(history_retention)
+            print(f"View history compacted: {removed} samples removed")
+        if export_text and video_data.text_outdated():
+            video_data.export_text()
+        video_data.close()
+    elif isinstance(video_data, TextStore):
+        video_data.close()
     else:
-        video_data[link] = video
-        video_data[link]['views'] = views
-        print(f"Added new video: {video['title']} ({views} views)")
+        save_video_data(video_data)
+
+class SearchLog:
+    """
+    Record of the tracks that were searched on YouTube: when, and with which queries, per artist.
+    Stored in the SQLite database, whichever storage backend is used for the videos.
+    """
+
+    def __init__(self, path='storage/tracetracks.db'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS track_searches '
+                '(artist_id TEXT, track_link TEXT, queries TEXT, searched_at REAL, PRIMARY KEY (artist_id, track_link))'
+            )
+            self.conn.execute('CREATE TABLE IF NOT EXISTS artist_runs (artist_id TEXT PRIMARY KEY, last_run_at REAL)')
+
+    def last_searches(self, artist_id):
+        """Return a dict of track link -> timestamp of the last search, for an artist"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT track_link, searched_at FROM track_searches WHERE artist_id = ?', (str(artist_id),)
+            ).fetchall()
+        return dict(rows)
+
+    def record(self, artist_id, track_link, queries):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO track_searches VALUES (?, ?, ?, ?)',
+                (str(artist_id), track_link, json.dumps(queries), time.time())
+            )
+
+    def last_run(self, artist_id):
+        """Timestamp of the last run for an artist, or None"""
+        with self.lock:
+            row = self.conn.execute('SELECT last_run_at FROM artist_runs WHERE artist_id = ?', (str(artist_id),)).fetchone()
+        return row[0] if row else None
+
+    def finish_run(self, artist_id):
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO artist_runs VALUES (?, ?)', (str(artist_id), time.time()))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class Checkpoint:
+    """
+    Progress of the current job, saved after each track so an interrupted run can continue with --resume:
+    per artist, the manifest entry (or None) and the tracks left to search (None if the artist wasn't started).
+    """
+
+    def __init__(self, path='storage/checkpoint.json'):
+        self.path = path
+        self.artists = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self.artists = json.load(file).get('artists', {})
+            except (ValueError, OSError) as e:
+                print(f"Warning: Could not read the checkpoint {path}: {e}")
+
+    def pending_tracks(self, username):
+        tracks = self.artists.get(username, {}).get('tracks')
+        return None if tracks is None else [Track.from_dict(track) for track in tracks]
+
+    def reset(self, entries):
+        """Start a new batch: every artist of the manifest is left to process"""
+        self.artists = {entry['username']: {'entry': entry, 'tracks': None} for entry in entries}
+        self.save()
+
+    def start(self, username, tracks):
+        """Record the tracks selected for an artist, before searching them"""
+        artist = self.artists.setdefault(username, {'entry': None, 'tracks': None})
+        artist['tracks'] = [track.to_dict() for track in tracks]
+        self.save()
+
+    def track_done(self, username, link):
+        artist = self.artists.get(username)
+        if artist and artist['tracks']:
+            artist['tracks'] = [track for track in artist['tracks'] if track['link'] != link]
+            self.save()
+
+    def done(self, username):
+        self.artists.pop(username, None)
+        self.save()
+
+    def save(self):
+        """Write the checkpoint atomically, or remove it when nothing is left"""
+        if not self.artists:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'artists': self.artists}, file)
+        os.replace(temp_path, self.path)
+
+def print_resume_hint(reason, tracks_left):
+    print(f"\n{reason}: {tracks_left} track(s) left, run again with --resume to continue")
+
+@metrics.timed('process_video')
+def process_video(video, video_data, artist_id=None, track_link=None):
+    """Process a single video and update storage if necessary. artist_id and track_link are the track it was found for"""
+    if isinstance(video_data, (VideoStore, TextStore)):
+        status = video_data.upsert(video, artist_id, track_link)
+        if status == 'updated':
+            print(f"Updated views for: {video.title} ({video.views} views)")
+        elif status == 'added':
+            print(f"Added new video: {video.title} ({video.views} views)")
+        return
+
+    existing = video_data.get(video.video_id)
+    if existing is None:
+        video_data[video.video_id] = video
+        append_journal(video)
+        print(f"Added new video: {video.title} ({video.views} views)")
+    elif video.views > existing.views:
+        video_data[video.video_id] = video
+        append_journal(video)
+        print(f"Updated views for: {video.title} ({video.views} views)")
+
+def enrich_channels(video_store, channel_ids, workers=1):
+    """Fetch the subscribers and video counts of the channels and save them in the sqlite storage"""
+    details = get_channel_details(sorted(channel_ids), workers)
+    video_store.save_channels(details.values())
 
 # --- Main code ---
 # https://serpapi.com/youtube-search-api#api-parameters-advanced-youtube-parameters
 # It can also be used for forcing the exact search query spelling by setting the sp value to QgIIAQ%3D%3D.
 # ?sp=QgIIAQ%3D%3D
 
-def main(username=None, client_id=None, song=None, all_tracks=False, sort_by="recent", num_tracks=1):
+def search_track(track, planner):
+    """Run both YouTube searches for a track and return a list of (query, videos) pairs"""
+    title_query = track.title + ' ' + track.author
+    return [
+        (title_query, planner.search(title_query)),
+        (track.link, planner.search(track.link)),
+    ]
+
+# Orders in which the selected tracks are searched when the quota may not be enough for all of them
+TRACK_PRIORITIES = {
+    'popular': lambda tracks: sorted(tracks, key=lambda x: x.playback_count, reverse=True),
+    'newest': lambda tracks: sorted(tracks, key=lambda x: x.created_at, reverse=True),
+    'oldest': lambda tracks: sorted(tracks, key=lambda x: x.created_at),
+}
+
+def process_artist(username, client_id, app_version, video_data, search_log, planner, song=None, all_tracks=False,
+                   sort_by="recent", num_tracks=1, workers=1, interactive=True, since_last_run=False, max_age_days=0,
+                   priority=None, pending_tracks=None, checkpoint=None):
     """
-    Main function to search for YouTube videos based on SoundCloud tracks
-    
-    Args:
-        username (str): SoundCloud username or link. If None, will prompt for input
-        client_id (str): SoundCloud client ID. If None, will prompt for input
-        song (str): Specific song title or link to search for. If provided, only this song will be processed
-        all_tracks (bool): If True, list all tracks and ask for each one individually
-        sort_by (str): Sorting method - "recent", "oldest", or "popular" (default: "recent")
-        num_tracks (int): Number of tracks to process (default: 1)
+    Search for YouTube videos based on the tracks of one SoundCloud artist and store them in video_data.
+    song can be a title, a SoundCloud link, or a list of them.
+    With interactive=False, every track matching --song or --all is processed without asking.
+    With since_last_run, only the tracks that were never searched (or not in the last max_age_days days) are processed.
+    priority ('popular', 'newest' or 'oldest') reorders the selected tracks before searching them.
+    pending_tracks (from a checkpoint) replaces the selection, and checkpoint records the progress after each track.
+    Returns the number of processed tracks. Raises QuotaExceeded with the tracks left when the quota runs out.
     """
-    
-    app_version = get_app_version()
-    
-    if username is None:
-        input_username = input("Enter the SoundCloud username or link: ").strip()
-    else:
-        input_username = username
-        
-    if client_id is None:
-        input_client_id = input("Enter the SoundCloud client ID: ").strip()
-        if not input_client_id:
-            print("Error: SoundCloud client ID is required!")
-            print("You can get it from the browser's developer tools, in the Network tab, when you load a SoundCloud page.")
-            print("Look for requests that have a 'client_id' parameter in the URL.")
-            return
-    else:
-        input_client_id = client_id
-        
-    if input_username.startswith('https://soundcloud.com/'):
-        artist_id = get_id_from_link(input_username)
+    if username.startswith('https://soundcloud.com/'):
+        artist_id = get_id_from_link(username)
         print(f"Artist ID from link: {artist_id}")
     else:
-        artist_id = search_by_username(input_username, input_client_id, app_version)
+        artist_id = search_by_username(username, client_id, app_version)
         print(f"Artist ID from username: {artist_id}")
 
     if not artist_id:
         print("Could not find artist ID")
-        return
+        return 0
 
-    video_data = load_existing_data()
-    print(f"Loaded {len(video_data)} existing videos from storage")
-
-    soundcloud_parsing = get_soundcloud_tracks(artist_id, input_client_id, app_version)
+    # Tracks are streamed most recent first, the full catalog is only loaded when the selection needs it
+    soundcloud_tracks = iter_soundcloud_tracks(artist_id, client_id, app_version)
     
+    if pending_tracks is not None:
+        # Resuming a run stopped by the quota
+        tracks_to_process = pending_tracks
+        print(f"Resuming {len(tracks_to_process)} pending track(s)")
+        
     # Filter by specific song if provided
-    if song:
-        print(f"Searching for specific song: {song}")        
-        if song.startswith('https://soundcloud.com/'):
-            song_slug = song.split('/')[-1]
-            filtered_tracks = [track for track in soundcloud_parsing if song_slug in track['link']]
-        else:
-            song_lower = song.lower()
-            filtered_tracks = [track for track in soundcloud_parsing if song_lower in track['title'].lower()]
+    elif song:
+        soundcloud_parsing = list(soundcloud_tracks)[::-1]
+        track_index = get_track_index(artist_id, soundcloud_parsing)
+        
+        filtered_tracks = []
+        for song_name in ([song] if isinstance(song, str) else song):
+            print(f"Searching for specific song: {song_name}")
+            matching_tracks, match = track_index.find(song_name)
+            if match == 'fuzzy' and matching_tracks:
+                print(f"No exact match for: {song_name}, using {len(matching_tracks)} close match(es)")
+            filtered_tracks += [track for track in matching_tracks if track not in filtered_tracks]
         
         if not filtered_tracks:
             print(f"No tracks found matching: {song}")
             print("Available tracks:")
             for track in soundcloud_parsing[::-1]:
-                print(f"  - {track['title']} ({track['link']})")
-            return
+                print(f"  - {track.title} ({track.link})")
+            return 0
         
         print(f"Found {len(filtered_tracks)} matching track(s)")
         tracks_to_select = filtered_tracks
         
     elif all_tracks:
-        print(f"Found {len(soundcloud_parsing)} tracks. Listing all tracks (most recent first):")
-        tracks_to_select = soundcloud_parsing[::-1]
+        print("Listing all tracks (most recent first):")
+        tracks_to_select = soundcloud_tracks
+        
+    elif since_last_run:
+        # Every track of the catalog that was never searched, or whose last search is too old
+        soundcloud_parsing = list(soundcloud_tracks)[::-1]
+        if sort_by == "oldest":
+            ordered_tracks = soundcloud_parsing
+        elif sort_by == "popular":
+            ordered_tracks = sorted(soundcloud_parsing, key=lambda x: x.playback_count, reverse=True)
+        else:
+            ordered_tracks = soundcloud_parsing[::-1]
+        
+        last_searches = search_log.last_searches(artist_id)
+        oldest_allowed = time.time() - max_age_days * 24 * 3600 if max_age_days else None
+        tracks_to_process = [
+            track for track in ordered_tracks
+            if track.link not in last_searches or (oldest_allowed and last_searches[track.link] < oldest_allowed)
+        ]
+        
+        last_run = search_log.last_run(artist_id)
+        if last_run:
+            print(f"Last run: {time.strftime('%Y-%m-%d %H:%M', time.localtime(last_run))}")
+        print(f"Processing {len(tracks_to_process)} new or outdated tracks out of {len(ordered_tracks)}")
+        
+    elif sort_by == "recent":
+        # Only the first pages are needed for the most recent tracks
+        tracks_to_process = list(itertools.islice(soundcloud_tracks, num_tracks))
+        soundcloud_tracks.close()
+        print(f"Processing {num_tracks} most recent tracks")
         
     else:
         # Apply sorting based on the sort_by parameter (when not using --song or --all)
+        soundcloud_parsing = list(soundcloud_tracks)[::-1]
         if sort_by == "oldest":
             # Keep original order (oldest first)
             tracks_to_process = soundcloud_parsing[:num_tracks]
             print(f"Processing {num_tracks} oldest tracks")
-        elif sort_by == "recent":
-            # Reverse order for most recent first
-            tracks_to_process = soundcloud_parsing[-num_tracks:][::-1]
-            print(f"Processing {num_tracks} most recent tracks")
         elif sort_by == "popular":
             # Sort tracks by playback_count in descending order (most popular first)
-            sorted_tracks = sorted(soundcloud_parsing, key=lambda x: x['playback_count'], reverse=True)
+            sorted_tracks = sorted(soundcloud_parsing, key=lambda x: x.playback_count, reverse=True)
             tracks_to_process = sorted_tracks[:num_tracks]
             print(f"Processing {num_tracks} most popular tracks")
         else:
             tracks_to_process = soundcloud_parsing[:num_tracks]
             print(f"Invalid sort_by parameter. Using default: {num_tracks} tracks")
     
-    # Interactive selection for --song or --all
-    if song or all_tracks:
-        tracks_to_process = []
-        for i, track in enumerate(tracks_to_select, 1):
-            print(f"\n{i}. {track['title']} by {track['author']}")
-            print(f"   Plays: {track['playback_count']:,}")
-            print(f"   Link: soundcloud.com/{track['link']}")
-            
-            print(f"Search for YouTube videos of this track? (y/n): ", end='', flush=True)
-            choice = get_single_key()
-            
-            print(f"[{choice}]")
+    # Searches run in parallel, results are merged in track order so the output stays deterministic
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        try:
+            # Interactive selection for --song or --all, each selected track starts searching right away
+            if (song or all_tracks) and interactive and pending_tracks is None:
+                tracks_to_process = []
+                searches = []
+                for i, track in enumerate(tracks_to_select, 1):
+                    print(f"\n{i}. {track.title} by {track.author}")
+                    print(f"   Plays: {track.playback_count:,}")
+                    print(f"   Link: soundcloud.com/{track.link}")
+                
+                    print(f"Search for YouTube videos of this track? (y/n): ", end='', flush=True)
+                    choice = get_single_key()
+                
+                    print(f"[{choice}]")
+                
+                    if choice == 'y':
+                        tracks_to_process.append(track)
+                        searches.append(executor.submit(search_track, track, planner))
+                        print("✓ Added to processing list")
+                    elif choice == 'n':
+                        print("✗ Skipped")
+                    else:
+                        print(f"✗ Skipped (unrecognized input: '{choice}')")
             
-            if choice == 'y':
-                tracks_to_process.append(track)
-                print("✓ Added to processing list")
-            elif choice == 'n':
-                print("✗ Skipped")
+                if not tracks_to_process:
+                    print("\nNo tracks selected for processing.")
+                    return 0
+                
+                print(f"\nProcessing {len(tracks_to_process)} selected track(s)")
             else:
-                print(f"✗ Skipped (unrecognized input: '{choice}')")
+                if (song or all_tracks) and pending_tracks is None:
+                    # Headless: every matching track is selected
+                    tracks_to_process = list(tracks_to_select)
+                    print(f"Processing {len(tracks_to_process)} track(s)")
+                if priority:
+                    tracks_to_process = TRACK_PRIORITIES[priority](tracks_to_process)
+                remaining = quota.remaining()
+                if remaining is not None:
+                    print(f"Quota budget: {remaining:,} units left, enough for about "
+                          f"{remaining // TRACK_QUOTA_COST} of {len(tracks_to_process)} track(s)")
+                searches = [executor.submit(search_track, track, planner) for track in tracks_to_process]
         
-        if not tracks_to_process:
-            print("\nNo tracks selected for processing.")
-            return
-            
-        print(f"\nProcessing {len(tracks_to_process)} selected track(s)")
+            if checkpoint:
+                checkpoint.start(username, tracks_to_process)
+            if isinstance(video_data, VideoStore) and tracks_to_process:
+                video_data.save_artist(artist_id, tracks_to_process[0].author)
+        
+            # Tracks that couldn't be searched because the quota ran out
+            tracks_left = []
+            channel_ids = set()
+            for track, search in zip(tracks_to_process, searches):
+                try:
+                    results = search.result()
+                except (QuotaExceeded, CancelledError):
+                    # The searches not started yet would fail too, they stay pending without sending their requests
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    tracks_left.append(track)
+                    continue
+                for i, (query, videos) in enumerate(results):
+                    if videos:
+                        print(f"Found {len(videos)} videos for '{query}':")
+                        for video in videos:
+                            print(f"  Title: {video.title}")
+                            print(f"  Views: {video.views}")
+                            print(f"  Channel: {video.author}")
+                            print(f"  Link: {video.link}")
+                            print()
+                            process_video(video, video_data, str(artist_id), track.link)
+                            if video.channel_id:
+                                channel_ids.add(video.channel_id)
+                    elif i == 0:
+                        print(f"No videos found for '{query}'")
+                search_log.record(artist_id, track.link, [query for query, _ in results])
+                if checkpoint:
+                    checkpoint.track_done(username, track.link)
+        except KeyboardInterrupt:
+            # Leaving the with block would run every queued search first: cancel them so Ctrl-C stops right away
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    if channel_ids and isinstance(video_data, VideoStore):
+        enrich_channels(video_data, channel_ids, workers)
+    if tracks_left:
+        raise QuotaExceeded("YouTube quota exhausted", pending_tracks=tracks_left)
+    search_log.finish_run(artist_id)
+    return len(tracks_to_process)
+
+def main(username=None, client_id=None, song=None, all_tracks=False, sort_by="recent", num_tracks=1, workers=1,
+         storage='sqlite', export_text=True, since_last_run=False, max_age_days=0, priority=None, resume=False,
+         history_retention=None):
+    """
+    Main function to search for YouTube videos based on SoundCloud tracks
     
-    for track in tracks_to_process:
-        videos = search_videos(track['title'] + ' ' + track['author'])
-        if videos:
-            print(f"Found {len(videos)} videos for '{track['title']} {track['author']}':")
-            for video in videos:
-                print(f"  Title: {video['title']}")
-                print(f"  Views: {video['views']}")
-                print(f"  Channel: {video['author']}")
-                print(f"  Link: {video['link']}")
-                print()
-                process_video(video, video_data)
-        else:
-            print(f"No videos found for '{track['title']} {track['author']}'")
+    Args:
+        username (str): SoundCloud username or link. If None, will prompt for input
+        client_id (str): SoundCloud client ID. If None, will prompt for input
+        song (str): Specific song title or link to search for. If provided, only this song will be processed
+        all_tracks (bool): If True, list all tracks and ask for each one individually
+        sort_by (str): Sorting method - "recent", "oldest", or "popular" (default: "recent")
+        num_tracks (int): Number of tracks to process (default: 1)
+        workers (int): Number of tracks searched in parallel (default: 1)
+        storage (str): Storage backend - "sqlite" or "text" (default: "sqlite")
+        export_text (bool): With the sqlite storage, also rewrite links.txt and links_info.txt at the end, if videos changed
+        since_last_run (bool): Only process the tracks never searched before, or searched more than max_age_days ago
+        max_age_days (float): With since_last_run, age after which a track is searched again (0 = never)
+        priority (str): Order of the searches - "popular", "newest" or "oldest" (default: selection order)
+        resume (bool): Search the tracks left by a previous run that was interrupted or stopped by the YouTube quota
+        history_retention (float): With the sqlite storage, compact the view history at the end of the run,
+            dropping the samples older than this many days (0 = keep all, only downsample)
+    """
+    
+    # Stops right away if youtube_api.key is missing
+    get_youtube()
+    app_version = get_app_version()
+    if not app_version:
+        print("Could not get the SoundCloud app version")
+        return
+    
+    if username is None:
+        input_username = input("Enter the SoundCloud username or link: ").strip()
+    else:
+        input_username = username
         
-        videos = search_videos(track['link'])
-        if videos:
-            print(f"Found {len(videos)} videos for '{track['link']}':")
-            for video in videos:
-                print(f"  Title: {video['title']}")
-                print(f"  Views: {video['views']}")
-                print(f"  Channel: {video['author']}")
-                print(f"  Link: {video['link']}")
-                print()
-                process_video(video, video_data)
-
-    save_video_data(video_data)
+    input_client_id = client_id or ask_client_id()
+    if not input_client_id:
+        return
+
+    video_data = open_storage(storage)
+    search_log = SearchLog()
+    planner = QueryPlanner()
+    print(f"Loaded {len(video_data)} existing videos from storage")
+
+    checkpoint = Checkpoint()
+    pending_tracks = checkpoint.pending_tracks(input_username) if resume else None
+    if resume and pending_tracks is None:
+        print(f"Nothing to resume for {input_username}, running normally")
+
+    snapshot = metrics.snapshot()
+    try:
+        process_artist(input_username, input_client_id, app_version, video_data, search_log, planner, song=song,
+                       all_tracks=all_tracks, sort_by=sort_by, num_tracks=num_tracks, workers=workers,
+                       since_last_run=since_last_run, max_age_days=max_age_days, priority=priority,
+                       pending_tracks=pending_tracks, checkpoint=checkpoint)
+        checkpoint.done(input_username)
+    except QuotaExceeded as e:
+        print_resume_hint(e, len(e.pending_tracks))
+    except SoundCloudError as e:
+        print(f"Error: {e}")
+    except KeyboardInterrupt:
+        print_resume_hint("Interrupted", len(checkpoint.pending_tracks(input_username) or []))
+    finally:
+        metrics.record_artist(input_username, snapshot)
+        print(f"Query planner: {planner.summary()}")
+        print(f"Saved {len(video_data)} videos to storage")
+        close_storage(video_data, export_text, history_retention)
+        search_log.close()
+
+def ask_client_id():
+    """Prompt for the SoundCloud client ID, returns None if it's left empty"""
+    input_client_id = input("Enter the SoundCloud client ID: ").strip()
+    if not input_client_id:
+        print("Error: SoundCloud client ID is required!")
+        print("You can get it from the browser's developer tools, in the Network tab, when you load a SoundCloud page.")
+        print("Look for requests that have a 'client_id' parameter in the URL.")
+        return None
+    return input_client_id
+
+# --- Batch Mode ---
+def build_manifest_parser():
+    """Parser of the lines of a .txt manifest: an artist followed by the same options as the command line"""
+    parser = argparse.ArgumentParser(prog='manifest line', add_help=False)
+    parser.add_argument('username', type=str)
+    parser.add_argument('--song', '-s', type=str, action='append')
+    parser.add_argument('--all', '-a', action='store_true', dest='all_tracks')
+    parser.add_argument('--sort-by', '-sb', type=str, choices=['recent', 'oldest', 'popular'], default='recent')
+    parser.add_argument('--num-tracks', '-n', type=int, default=1)
+    return parser
+
+def load_manifest(path):
+    """
+    Read the artists of a batch manifest, as a list of dicts with the arguments of process_artist().
+    .jsonl manifests have one JSON object per line: {"username": ..., "song": ..., "all": ..., "sort_by": ..., "num_tracks": ...}
+    Other manifests have one artist per line, with optional arguments: artist_name --sort-by popular -n 5
+    Several songs can be given per artist: a list for "song", or a repeated --song.
+    Empty lines and lines starting with # are ignored.
+    """
+    entries = []
+    parser = build_manifest_parser()
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                if path.endswith('.jsonl'):
+                    data = json.loads(line)
+                    entry = {
+                        'username': data['username'],
+                        'song': data.get('song'),
+                        'all_tracks': bool(data.get('all', False)),
+                        'sort_by': data.get('sort_by', 'recent'),
+                        'num_tracks': int(data.get('num_tracks', 1)),
+                    }
+                else:
+                    entry = vars(parser.parse_args(shlex.split(line)))
+            except (ValueError, KeyError, SystemExit):
+                print(f"Warning: Skipping invalid line {line_number} of {path}: {line}")
+                continue
+            entries.append(entry)
+    return entries
+
+def run_batch(manifest, client_id=None, workers=1, storage='sqlite', export_text=True, since_last_run=False,
+              max_age_days=0, priority=None, resume=False, history_retention=None):
+    """
+    Process every artist of a manifest in a single run, sharing the app version and the storage.
+    Selections are headless: --song and --all process every matching track without asking.
+    The checkpoint keeps the artists and tracks left: when the run is interrupted or the YouTube quota runs out,
+    resume processes only them.
+    """
+    checkpoint = Checkpoint()
+    if resume:
+        entries = [artist['entry'] for artist in checkpoint.artists.values() if artist['entry']]
+        if not entries:
+            print("Nothing to resume")
+            return
+    else:
+        entries = load_manifest(manifest)
+        if not entries:
+            print(f"No artists found in {manifest}")
+            return
+        checkpoint.reset(entries)
+
+    input_client_id = client_id or ask_client_id()
+    if not input_client_id:
+        return
+
+    # Stops right away if youtube_api.key is missing
+    get_youtube()
+    app_version = get_app_version()
+    if not app_version:
+        print("Could not get the SoundCloud app version")
+        return
+
+    video_data = open_storage(storage)
+    search_log = SearchLog()
+    print(f"Loaded {len(video_data)} existing videos from storage")
+
+    # Searches and video details are shared between the artists of the batch
+    planner = QueryPlanner()
+    try:
+        for i, entry in enumerate(entries, 1):
+            print("\n" + "="*60)
+            print(f"[{i}/{len(entries)}] {entry['username']}")
+            print("="*60)
+            snapshot = metrics.snapshot()
+            quota_error = None
+            try:
+                process_artist(entry['username'], input_client_id, app_version, video_data, search_log, planner,
+                               song=entry['song'], all_tracks=entry['all_tracks'], sort_by=entry['sort_by'],
+                               num_tracks=entry['num_tracks'], workers=workers, interactive=False,
+                               since_last_run=since_last_run, max_age_days=max_age_days, priority=priority,
+                               pending_tracks=checkpoint.pending_tracks(entry['username']) if resume else None,
+                               checkpoint=checkpoint)
+                checkpoint.done(entry['username'])
+            except QuotaExceeded as e:
+                quota_error = e
+            except Exception as e:
+                # The artist stays in the checkpoint, --resume tries it again
+                print(f"Error while processing {entry['username']}: {e}")
+                metrics.count('errors.artists')
+            metrics.record_artist(entry['username'], snapshot)
+
+            # New videos are already saved, the updated view counts of the text storage are written once per artist
+            if isinstance(video_data, TextStore):
+                with metrics.span('storage_save'):
+                    video_data.save()
+
+            if quota_error:
+                print_resume_hint(quota_error, len(quota_error.pending_tracks))
+                print(f"{len(entries) - i} artist(s) not started")
+                break
+    except KeyboardInterrupt:
+        tracks_left = sum(len(artist['tracks'] or []) for artist in checkpoint.artists.values())
+        print_resume_hint("Interrupted", tracks_left)
+        print(f"{len(checkpoint.artists)} artist(s) left")
+
+    print(f"\nQuery planner: {planner.summary()}")
     print(f"Saved {len(video_data)} videos to storage")
+    close_storage(video_data, export_text, history_retention)
+    search_log.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='TraceTracks - Find YouTube videos based on SoundCloud tracks')
     parser.add_argument('--username', '-u', type=str, help='SoundCloud username or profile URL')
+    parser.add_argument('--batch', '-b', type=str,
+                       help='Process every artist of a manifest file (.txt or .jsonl) without prompting')
     parser.add_argument('--client-id', '-c', type=str, help='SoundCloud client ID (if not provided, will prompt for input)')
     parser.add_argument('--song', '-s', type=str, help='Search for a specific song by title or SoundCloud link')
     parser.add_argument('--all', '-a', action='store_true', help='List all tracks and ask for each one individually')
@@ -400,7 +2363,60 @@ if __name__ == '__main__':
                        default='recent', help='Sort tracks by: recent, oldest, or popular (default: recent)')
     parser.add_argument('--num-tracks', '-n', type=int, default=1, 
                        help='Number of tracks to process (default: 1)')
+    parser.add_argument('--since-last-run', action='store_true',
+                       help='Only search the tracks never searched before (or older than --max-age), ignores --num-tracks')
+    parser.add_argument('--max-age', type=float, default=0,
+                       help='With --since-last-run, search a track again if its last search is older than this many days (default: 0, never)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                       help='Number of tracks to search in parallel (default: 1)')
+    parser.add_argument('--quota-budget', type=int,
+                       help='Maximum YouTube quota units spent by the run (search: 100, video details: 1), stops cleanly when reached')
+    parser.add_argument('--priority', type=str, choices=list(TRACK_PRIORITIES),
+                       help='Order in which the selected tracks are searched, so the most wanted ones fit in the quota')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue the last run that was interrupted or stopped by the YouTube quota, skipping the tracks already done')
+    parser.add_argument('--youtube-rps', type=float, default=10,
+                       help='Maximum YouTube API requests per second, 0 for no limit (default: 10)')
+    parser.add_argument('--soundcloud-rps', type=float, default=5,
+                       help='Maximum SoundCloud requests per second, 0 for no limit (default: 5)')
+    parser.add_argument('--pool-size', type=int, default=10,
+                       help='Number of HTTP connections kept alive per host (default: 10)')
+    parser.add_argument('--timeout', type=float, default=10,
+                       help='Timeout of each HTTP request, in seconds (default: 10)')
+    parser.add_argument('--max-retries', type=int, default=4,
+                       help='Retries of rate limited (429), failed (5xx) or timed out requests (default: 4)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the response cache')
+    parser.add_argument('--refresh', action='store_true', help='Ignore cached responses but store the fresh ones')
+    parser.add_argument('--cache-size', type=int, default=50000,
+                       help='Maximum number of cached responses (default: 50000)')
+    parser.add_argument('--storage', type=str, choices=['sqlite', 'text'], default='sqlite',
+                       help='Storage backend: sqlite (storage/tracetracks.db) or text (storage/links_info.txt) (default: sqlite)')
+    parser.add_argument('--no-text-export', action='store_true',
+                       help='With the sqlite storage, never rewrite links.txt and links_info.txt at the end of the run')
+    parser.add_argument('--history-retention', type=float,
+                       help='With the sqlite storage, compact the view history at the end of the run: keep one sample per day '
+                            'after 30 days, and drop the samples older than this many days (0 = keep all)')
+    parser.add_argument('--profile-out', type=str,
+                       help='Write the performance report (timings, API calls, cache hits, quota units) to this JSON file')
     
     args = parser.parse_args()
     
-    main(username=args.username, client_id=args.client_id, song=args.song, all_tracks=args.all, sort_by=args.sort_by, num_tracks=args.num_tracks)
\ No newline at end of file
+    configure_rate_limits(args.youtube_rps, args.soundcloud_rps)
+    configure_http(pool_size=args.pool_size, timeout=args.timeout, max_retries=args.max_retries)
+    configure_cache(enabled=not args.no_cache, refresh=args.refresh, max_entries=args.cache_size)
+    configure_quota(args.quota_budget)
+    try:
+        if args.batch:
+            run_batch(args.batch, client_id=args.client_id, workers=args.workers, storage=args.storage,
+                      export_text=not args.no_text_export, since_last_run=args.since_last_run, max_age_days=args.max_age,
+                      priority=args.priority, resume=args.resume, history_retention=args.history_retention)
+        else:
+            main(username=args.username, client_id=args.client_id, song=args.song, all_tracks=args.all, sort_by=args.sort_by, num_tracks=args.num_tracks, workers=args.workers,
+                 storage=args.storage, export_text=not args.no_text_export, since_last_run=args.since_last_run,
+                 max_age_days=args.max_age, priority=args.priority, resume=args.resume,
+                 history_retention=args.history_retention)
+    finally:
+        metrics.print_summary()
+        if args.profile_out:
+            metrics.write_json(args.profile_out)
+            print(f"Performance report written to {args.profile_out}")
\ No newline at end of file